@@ -17,7 +17,7 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "user.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
@@ -36,6 +36,18 @@ DEBUG = True
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
+# Media files are served by movies.media.MediaFile, which checks access and then
+# hands the transfer to the front proxy: "nginx" (X-Accel-Redirect to an internal
+# location MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT), "apache" (mod_xsendfile) or
+# "" to stream from Django with a FileResponse.
+MEDIA_SENDFILE_BACKEND = ""
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+# Files written by the background export admin actions (kept outside MEDIA_ROOT).
+EXPORT_ROOT = os.path.join(BASE_DIR, "exports")
+# Largest file accepted by the resumable upload API, in bytes.
+UPLOAD_MAX_SIZE = 10 * 1024 ** 3
+# Upload sessions untouched for this many seconds are removed by sweep_media.
+UPLOAD_SESSION_TTL = 24 * 60 * 60
 # Application definition
 LOGIN_URL = "movie-town.ihor-tsarkov.com/login"
 INSTALLED_APPS = [
@@ -70,17 +82,46 @@ CORS_ALLOWED_ORIGINS = [
     
 ]
 
+RQ_CONNECTION = {
+    "HOST": "localhost",
+    "PORT": 6379,
+    "DB": 0,
+    #for windows:"WORKER_CLASS": "rq_win.WindowsWorker",
+    "AUTOCOMMIT": True,
+}
+
+# Jobs are routed by type so long encodes cannot starve thumbnails or mail.
+# Workers take queues in the order given, e.g.
+# python manage.py rqworker --with-scheduler thumbnails mail transcode_fast transcode_segments transcode_heavy default
 RQ_QUEUES = {
-    "default": {
-        "HOST": "localhost",
-        "PORT": 6379,
-        "DB": 0,
-        "DEFAULT_TIMEOUT": 360,
-        #for windows:"WORKER_CLASS": "rq_win.WindowsWorker",
-        "AUTOCOMMIT": True,
-    },
+    "default": {**RQ_CONNECTION, "DEFAULT_TIMEOUT": 360},
+    "thumbnails": {**RQ_CONNECTION, "DEFAULT_TIMEOUT": 300},
+    "transcode_fast": {**RQ_CONNECTION, "DEFAULT_TIMEOUT": 1800},
+    "transcode_segments": {**RQ_CONNECTION, "DEFAULT_TIMEOUT": 1800},
+    "transcode_heavy": {**RQ_CONNECTION, "DEFAULT_TIMEOUT": 4 * 60 * 60},
+    "mail": {**RQ_CONNECTION, "DEFAULT_TIMEOUT": 120},
 }
 
+# Transcode jobs get TRANSCODE_TIMEOUT_FACTOR seconds per second of source (at least
+# TRANSCODE_MIN_TIMEOUT); sources longer than TRANSCODE_HEAVY_MIN_DURATION seconds
+# go to the transcode_heavy queue.
+TRANSCODE_TIMEOUT_FACTOR = 3
+TRANSCODE_MIN_TIMEOUT = 360
+TRANSCODE_HEAVY_MIN_DURATION = 600
+# Sources of at least SEGMENT_TRANSCODE_MIN_DURATION seconds are cut into
+# SEGMENT_TRANSCODE_SECONDS long segments, encoded in parallel from the
+# transcode_segments queue, which workers take only after transcode_fast.
+SEGMENT_TRANSCODE_MIN_DURATION = 1200
+SEGMENT_TRANSCODE_SECONDS = 120
+# The thumbnail job decodes the whole source for the preview sprite, so it gets
+# THUMBNAIL_TIMEOUT_FACTOR seconds per second of source (at least THUMBNAIL_MIN_TIMEOUT).
+THUMBNAIL_TIMEOUT_FACTOR = 1
+THUMBNAIL_MIN_TIMEOUT = 300
+# x264 preset and encoder thread count of the renditions (0 lets FFmpeg choose).
+# Use `python manage.py bench_transcode` to compare settings on the worker hardware.
+TRANSCODE_PRESET = "medium"
+TRANSCODE_THREADS = 0
+
 
 # redis setting
 CACHES = {
@@ -94,9 +135,32 @@ CACHES = {
     }
 }
 CACHE_TTL= 30
-
-
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Cached video listing pages are invalidated by movies.cache when movies change,
+# so the TTL only bounds how long unused pages occupy Redis.
+VIDEO_LIST_CACHE_TTL = 60 * 60
+# Files of private movies are linked with signed URLs (movies.signing). URLs signed
+# within the same MEDIA_SIGNED_URL_PERIOD share one expiry, at least
+# MEDIA_SIGNED_URL_TTL seconds ahead, so they outlive the cached listing pages.
+MEDIA_SIGNED_URL_PERIOD = 60 * 60
+MEDIA_SIGNED_URL_TTL = VIDEO_LIST_CACHE_TTL
+
+# Seconds a token → user lookup of CachedTokenAuthentication stays in the cache.
+AUTH_TOKEN_CACHE_TTL = 5 * 60
+
+# Page size of the video listing, and the largest size clients may ask for.
+VIDEO_PAGE_SIZE = 20
+VIDEO_MAX_PAGE_SIZE = 100
+
+
+# Mail sent by requests is queued in Redis (user.mail) and delivered by the "mail"
+# RQ queue in batches of up to MAIL_BATCH_SIZE over one MAIL_OUTBOX_BACKEND
+# connection. Tests use Django's in-memory backend instead.
+EMAIL_BACKEND = "user.mail.QueuedEmailBackend"
+MAIL_OUTBOX_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+MAIL_BATCH_SIZE = 100
+MAIL_FLUSH_TIMEOUT = 120
+# Messages failing MAIL_MAX_ATTEMPTS deliveries are moved to the mail:outbox:dead list.
+MAIL_MAX_ATTEMPTS = 10
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_HOST_USER = "ihortsarkov@gmail.com"
 EMAIL_HOST_PASSWORD = "pwre oqtd ggxe qgmt"
@@ -168,6 +232,26 @@ DATABASES = {
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
+# Work factor of the password hasher; raising it re-hashes passwords on next login.
+PASSWORD_HASH_ITERATIONS = 600_000
+PASSWORD_HASHERS = [
+    "user.hashers.TunablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# Sliding-window limits (attempts, seconds) per client address and per targeted
+# email, checked by user.ratelimit before any password is hashed.
+RATE_LIMITS = {
+    "login": {"ip": (20, 60), "email": (5, 5 * 60)},
+    "password_reset": {"ip": (5, 5 * 60), "email": (3, 60 * 60)},
+}
+# Number of reverse proxies in front of Django that append to X-Forwarded-For
+# (1 behind the nginx setup in the readme). 0 uses REMOTE_ADDR as the client address.
+RATE_LIMIT_TRUSTED_PROXIES = 0
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
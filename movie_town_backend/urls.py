@@ -19,7 +19,9 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
-from movies.views import Video
+from movies.media import MediaFile
+from movies.uploads import UploadSessionCommit, UploadSessionDetail, UploadSessions
+from movies.views import OwnVideos, Video, VideoSearch, VideoStatus, VideoThumbnail
 from user.views import (
     CurrentUser,
     CustomLoginView,
@@ -40,13 +42,46 @@ urlpatterns = [
     path("signup/", SignUp.as_view(), name="signup"),
     path("current_user/", CurrentUser.as_view(), name="current_user"),
     path("movie_select/", Movie_Select.as_view()),
+    path("me/videos/", OwnVideos.as_view(), name="own_videos"),
     path("video/", Video.as_view(), name="video"),
+    path("video/search/", VideoSearch.as_view(), name="video_search"),
     path("video/<int:user_id>/", Video.as_view(), name="video_with_user"),
+    path(
+        "video/<int:movie_id>/status/",
+        VideoStatus.as_view(),
+        name="video_status",
+    ),
+    path(
+        "video/<int:movie_id>/thumbnail/",
+        VideoThumbnail.as_view(),
+        name="video_thumbnail",
+    ),
     path(
         "video/<int:user_id>/<int:movie_id>/",
         Video.as_view(),
         name="video_with_user_movie",
     ),
+    path("upload/", UploadSessions.as_view(), name="upload"),
+    path(
+        "upload/<uuid:upload_id>/",
+        UploadSessionDetail.as_view(),
+        name="upload_detail",
+    ),
+    path(
+        "upload/<uuid:upload_id>/commit/",
+        UploadSessionCommit.as_view(),
+        name="upload_commit",
+    ),
+    path(
+        settings.MEDIA_URL.lstrip("/") + "s/<int:expires>/<str:signature>/<path:name>",
+        MediaFile.as_view(),
+        name="signed_media",
+    ),
+    path(
+        settings.MEDIA_URL.lstrip("/") + "<path:name>",
+        MediaFile.as_view(),
+        name="media",
+    ),
     path("verification/", include("verify_email.urls")),
     path("password_reset/", ResetPasswordView.as_view()),
     path(
@@ -65,5 +100,4 @@ urlpatterns = [
 
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
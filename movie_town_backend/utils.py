@@ -1,22 +1,299 @@
-from movies.admin import CustomMovieResource
-from user.admin import CustomUserResource
+import csv
+import json
+import os
 
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+import django_rq
 
-def export_data():
-    
-    movie_resource = CustomMovieResource()
-    user_resource = CustomUserResource()
+from movies.cache import invalidate_movie
 
-    # Exports datasets using the instances
-    movie_dataset = movie_resource.export()
-    user_dataset = user_resource.export()
+# Models handled by the import/export commands and admin actions, by short name.
+EXPORT_MODELS = {
+    "movies": "movies.Movie",
+    "users": "user.CustomUser",
+}
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 500
 
-    # Saves datasets to CSV files
-    with open('movies.csv', 'w') as movie_file:
-        movie_file.write(movie_dataset.csv)
 
-    with open('users.csv', 'w') as user_file:
-        user_file.write(user_dataset.csv)
+def export_model(name):
+    return apps.get_model(EXPORT_MODELS[name])
 
-   
 
+def export_fields(model):
+    """
+    Return the concrete fields written for a model; foreign keys as their `<name>_id`.
+    """
+    return list(model._meta.concrete_fields)
+
+
+def export_queryset(queryset, path, format="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Write a queryset to a CSV or JSON Lines file row by row.
+
+    Rows are fetched with `values_list().iterator()`, so memory use is bounded by
+    `chunk_size` rows no matter how large the table is, and no model instances or
+    in-memory dataset are built.
+
+    Args:
+        queryset (QuerySet): The rows to export.
+        path (str): The file to write.
+        format (str): `csv` or `jsonl`.
+        chunk_size (int): Rows fetched from the database per round trip.
+
+    Returns:
+        int: The number of rows written.
+    """
+    columns = [field.attname for field in export_fields(queryset.model)]
+    rows = queryset.order_by("pk").values_list(*columns).iterator(chunk_size=chunk_size)
+
+    count = 0
+    with open(path, "w", newline="") as output:
+        if format == "csv":
+            writer = csv.writer(output)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                output.write(json.dumps(dict(zip(columns, row)), default=str) + "\n")
+                count += 1
+    return count
+
+
+def read_rows(path, format):
+    """
+    Yield the rows of a CSV or JSON Lines file as dictionaries, one at a time.
+    """
+    with open(path, newline="") as source:
+        if format == "csv":
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def import_file(model, path, format=None, batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    """
+    Load a CSV or JSON Lines export into a model in batches.
+
+    Each batch of `batch_size` rows costs one query to find the existing primary keys,
+    one `bulk_create` for the new rows and one `bulk_update` for the others, in its
+    own transaction. Model `save()` and signals are not run, so imported movies are
+    not re-processed.
+
+    Args:
+        model: The model class to import into.
+        path (str): The file to read; the format is taken from its extension by default.
+        format (str, optional): `csv` or `jsonl`.
+        batch_size (int): Rows written per transaction.
+        on_batch (callable, optional): Called with the instances of every saved batch.
+
+    Returns:
+        tuple: The numbers of created and updated rows.
+    """
+    if format is None:
+        format = os.path.splitext(path)[1].lstrip(".")
+    fields = {field.attname: field for field in export_fields(model)}
+    update_fields = [field.name for field in fields.values() if not field.primary_key]
+
+    created = updated = 0
+    batch = []
+    for row in read_rows(path, format):
+        values = {}
+        for column, value in row.items():
+            field = fields.get(column)
+            if field is None:
+                continue
+            if value == "" and field.null:
+                value = None
+            values[column] = field.to_python(value)
+        batch.append(model(**values))
+        if len(batch) >= batch_size:
+            batch_created, batch_updated = save_batch(model, batch, update_fields)
+            created, updated = created + batch_created, updated + batch_updated
+            if on_batch:
+                on_batch(batch)
+            batch = []
+    if batch:
+        batch_created, batch_updated = save_batch(model, batch, update_fields)
+        created, updated = created + batch_created, updated + batch_updated
+        if on_batch:
+            on_batch(batch)
+
+    # Rows were inserted with explicit primary keys; move the id sequence past them.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+    return created, updated
+
+
+def save_batch(model, instances, update_fields):
+    pks = [instance.pk for instance in instances if instance.pk is not None]
+    existing = set(model.objects.filter(pk__in=pks).values_list("pk", flat=True))
+    new = [instance for instance in instances if instance.pk not in existing]
+    changed = [instance for instance in instances if instance.pk in existing]
+    with transaction.atomic():
+        model.objects.bulk_create(new, batch_size=len(instances))
+        if changed:
+            model.objects.bulk_update(changed, update_fields, batch_size=len(instances))
+    return len(new), len(changed)
+
+
+def export_path(name, format):
+    os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+    stamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(settings.EXPORT_ROOT, f"{name}-{stamp}.{format}")
+
+
+def export_job(name, format="csv", pks=None):
+    """
+    RQ job exporting a model, or only the rows in `pks`, to `EXPORT_ROOT`.
+
+    Returns:
+        str: The path of the written file.
+    """
+    queryset = export_model(name).objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    path = export_path(name, format)
+    export_queryset(queryset, path, format)
+    return path
+
+
+def import_job(name, path, format=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    RQ job importing an export file; cached movie listings are invalidated afterwards.
+
+    Returns:
+        tuple: The numbers of created and updated rows.
+    """
+    model = export_model(name)
+    user_ids = set()
+
+    def collect_users(instances):
+        user_ids.update(instance.user_id for instance in instances)
+
+    result = import_file(
+        model,
+        path,
+        format,
+        batch_size,
+        on_batch=collect_users if name == "movies" else None,
+    )
+    for user_id in user_ids:
+        invalidate_movie(user_id, "public")
+    return result
+
+
+def background_export_action(name, format):
+    """
+    Build an admin action that exports the selected rows in an RQ job.
+    """
+
+    def action(modeladmin, request, queryset):
+        pks = list(queryset.values_list("pk", flat=True))
+        job = django_rq.get_queue("default").enqueue(
+            export_job, name, format, pks, job_timeout=60 * 60
+        )
+        modeladmin.message_user(
+            request,
+            f"Export of {len(pks)} rows queued as job {job.id}; "
+            f"the file is written to {settings.EXPORT_ROOT}.",
+        )
+
+    action.__name__ = f"export_{format}_in_background"
+    action.short_description = f"Export selected to {format.upper()} in the background"
+    return action
+
+
+class ImportFileForm(forms.Form):
+    file = forms.FileField(help_text="A CSV or JSON Lines export (.csv or .jsonl).")
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if os.path.splitext(file.name)[1].lstrip(".") not in EXPORT_FORMATS:
+            raise forms.ValidationError("Upload a .csv or .jsonl file.")
+        return file
+
+
+def save_import_file(name, file):
+    """
+    Save an uploaded import file to `EXPORT_ROOT` chunk by chunk and return its path.
+    """
+    os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+    stamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+    extension = os.path.splitext(file.name)[1].lower()
+    path = os.path.join(settings.EXPORT_ROOT, f"import-{name}-{stamp}{extension}")
+    with open(path, "wb") as target:
+        for chunk in file.chunks():
+            target.write(chunk)
+    return path
+
+
+class BackgroundImportAdmin(admin.ModelAdmin):
+    """
+    Model admin with an import page whose file is loaded by an RQ job.
+
+    Replaces django-import-export's admin import, which saves one row at a time
+    inside the request. The upload is saved to `EXPORT_ROOT` and `import_job` loads
+    it in batches. `import_name` is the `EXPORT_MODELS` entry of the model.
+    """
+
+    import_name = None
+    change_list_template = "admin/background_import_change_list.html"
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name=f"{opts.app_label}_{opts.model_name}_import",
+            )
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        opts = self.model._meta
+        form = ImportFileForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            path = save_import_file(self.import_name, form.cleaned_data["file"])
+            job = django_rq.get_queue("default").enqueue(
+                import_job, self.import_name, path, job_timeout=60 * 60
+            )
+            self.message_user(
+                request, f"Import of {os.path.basename(path)} queued as job {job.id}."
+            )
+            return redirect(f"admin:{opts.app_label}_{opts.model_name}_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": opts,
+            "form": form,
+            "title": f"Import {opts.verbose_name_plural}",
+        }
+        return TemplateResponse(request, "admin/background_import.html", context)
+
+
+def export_data(directory=".", format="csv"):
+    """
+    Export all movies and users to `movies.<format>` and `users.<format>`.
+    """
+    for name in EXPORT_MODELS:
+        export_queryset(
+            export_model(name).objects.all(),
+            os.path.join(directory, f"{name}.{format}"),
+            format,
+        )
@@ -1,7 +1,11 @@
 from django.contrib import admin
-from movies.models import Movie
+from movies.models import Movie, Rendition
 from import_export import resources
-from import_export.admin import ImportExportModelAdmin
+from movie_town_backend.utils import (
+    EXPORT_FORMATS,
+    BackgroundImportAdmin,
+    background_export_action,
+)
 
 
 # ImportExport class exitinheritance.
@@ -9,9 +13,16 @@ class CustomMovieResource(resources.ModelResource):
     class Meta:
         model = Movie
 
-# ImportExport class inheritance.
-class MovieAdmin(ImportExportModelAdmin):
-    resource_class = CustomMovieResource
+class RenditionInline(admin.TabularInline):
+    model = Rendition
+    extra = 0
+    readonly_fields = ("resolution", "path", "bytes", "bitrate", "ready")
+
+class MovieAdmin(BackgroundImportAdmin):
+    import_name = "movies"
+    inlines = [RenditionInline]
+    # Exports and imports are streamed by an RQ worker.
+    actions = [background_export_action("movies", format) for format in EXPORT_FORMATS]
 
 
 
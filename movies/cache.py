@@ -0,0 +1,80 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+from .signing import url_epoch
+
+PUBLIC_VERSION_KEY = "video_list:public:version"
+
+
+def user_version_key(user_id):
+    """
+    Return the cache key holding the version of a user's private listing.
+    """
+    return f"video_list:user:{user_id}:version"
+
+
+def listing_cache_key(request, user_id):
+    """
+    Build the cache key of a video listing response.
+
+    The key embeds the current version of the public listing and, for a user listing,
+    the version of that user's private movies. Bumping a version makes every entry
+    built from the old one unreachable, so stale pages are never served and the
+    shared public pages survive changes to private movies. User listings hold signed
+    URLs, so their keys also change with the signing period (see `movies.signing`).
+
+    Args:
+        request (Request): The HTTP request; its host and query parameters are part of the key.
+        user_id (int or None): The user whose private movies are included.
+
+    Returns:
+        str: The cache key.
+    """
+    version_keys = [PUBLIC_VERSION_KEY]
+    if user_id:
+        version_keys.append(user_version_key(user_id))
+    versions = cache.get_many(version_keys)
+
+    parts = [f"p{versions.get(PUBLIC_VERSION_KEY, 0)}"]
+    if user_id:
+        parts.append(f"u{user_id}.{versions.get(user_version_key(user_id), 0)}")
+        parts.append(f"e{url_epoch()}")
+
+    query = urlencode(sorted(request.query_params.items()))
+    digest = hashlib.md5(f"{request.get_host()}?{query}".encode()).hexdigest()
+    return f"video_list:{':'.join(parts)}:{digest}"
+
+
+def get_cached_listing(key):
+    return cache.get(key)
+
+
+def set_cached_listing(key, data):
+    cache.set(key, data, getattr(settings, "VIDEO_LIST_CACHE_TTL", 3600))
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The first bump of a version creates it; versions never expire.
+        cache.set(key, 1, None)
+
+
+def invalidate_movie(user_id, *accesses):
+    """
+    Invalidate the cached listings a movie appears in.
+
+    The owner's listing is always invalidated. The shared public listing is only
+    invalidated when the movie is, or was, public.
+
+    Args:
+        user_id (int): The owner of the movie.
+        *accesses (str): The access values the movie had before and after the change.
+    """
+    bump_version(user_version_key(user_id))
+    if "public" in accesses:
+        bump_version(PUBLIC_VERSION_KEY)
@@ -0,0 +1,196 @@
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.tasks import FFMPEG_PATH, build_transcode_command, rendition_ladder
+
+
+def csv_list(value, cast=str):
+    """
+    Parses a comma separated command line option into a list.
+    """
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def frame_size(value):
+    """
+    Parses a `WIDTHxHEIGHT` frame size into a `(width, height)` tuple.
+    """
+    width, _, height = value.partition("x")
+    return int(width), int(height)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the transcode pipeline on synthetic sources and prints wall time, "
+        "CPU time, realtime factor and output size per run as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--durations",
+            default="10,60",
+            help="Comma separated source lengths in seconds (default: 10,60).",
+        )
+        parser.add_argument(
+            "--sizes",
+            default="1280x720,1920x1080",
+            help="Comma separated source frame sizes (default: 1280x720,1920x1080).",
+        )
+        parser.add_argument(
+            "--presets",
+            default="veryfast,medium",
+            help="Comma separated x264 presets to compare (default: veryfast,medium).",
+        )
+        parser.add_argument(
+            "--threads",
+            default="0",
+            help="Comma separated encoder thread counts, 0 is automatic (default: 0).",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the JSON report to this file instead of stdout.",
+        )
+
+    def handle(self, *args, **options):
+        if not shutil.which(FFMPEG_PATH):
+            raise CommandError(f"FFmpeg not found at {FFMPEG_PATH}.")
+
+        durations = csv_list(options["durations"], int)
+        sizes = csv_list(options["sizes"], frame_size)
+        presets = csv_list(options["presets"])
+        threads = csv_list(options["threads"], int)
+
+        work_dir = tempfile.mkdtemp(prefix="bench_transcode_")
+        runs = []
+        try:
+            for duration in durations:
+                for width, height in sizes:
+                    source_path = os.path.join(
+                        work_dir, f"source_{width}x{height}_{duration}s.mp4"
+                    )
+                    self.create_source(source_path, width, height, duration)
+                    for preset in presets:
+                        for thread_count in threads:
+                            runs += self.bench_source(
+                                source_path,
+                                (width, height),
+                                duration,
+                                preset,
+                                thread_count,
+                                work_dir,
+                            )
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        report = json.dumps(
+            {
+                "host": {
+                    "machine": platform.machine(),
+                    "processor": platform.processor(),
+                    "cpu_count": os.cpu_count(),
+                },
+                "runs": runs,
+            },
+            indent=2,
+        )
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(report)
+        else:
+            self.stdout.write(report)
+
+    def create_source(self, path, width, height, duration):
+        """
+        Generates a synthetic source clip with moving test patterns and a tone.
+
+        The source is written near-losslessly so the encoder under test, not the
+        decoder, dominates the measured time.
+        """
+        cmd = [
+            FFMPEG_PATH,
+            "-y",
+            "-f", "lavfi",
+            "-i", f"testsrc2=size={width}x{height}:rate=30:duration={duration}",
+            "-f", "lavfi",
+            "-i", f"sine=frequency=440:duration={duration}",
+            "-c:v", "libx264",
+            "-preset", "ultrafast",
+            "-crf", "12",
+            "-pix_fmt", "yuv420p",
+            "-c:a", "aac",
+            "-shortest",
+            path,
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"FFmpeg error: {e.stderr}") from e
+
+    def bench_source(self, source_path, size, duration, preset, threads, work_dir):
+        """
+        Times the single-pass ladder and every rendition on its own for one source.
+
+        Returns:
+            list: One result dictionary per measured run.
+        """
+        ladder = rendition_ladder(size[1])
+        paths = [("ladder", ladder)] + [
+            (resolution, [(resolution, height)]) for resolution, height in ladder
+        ]
+
+        results = []
+        for name, rungs in paths:
+            output_paths = {
+                resolution: os.path.join(work_dir, f"out_{resolution}.mp4")
+                for resolution, _ in rungs
+            }
+            cmd = build_transcode_command(
+                source_path, rungs, output_paths, preset=preset, threads=threads
+            )
+            wall_time, cpu_time = self.run_timed(cmd)
+            output_size = sum(os.path.getsize(path) for path in output_paths.values())
+            for path in output_paths.values():
+                os.remove(path)
+
+            results.append(
+                {
+                    "source": f"{size[0]}x{size[1]}",
+                    "duration": duration,
+                    "path": name,
+                    "preset": preset,
+                    "threads": threads,
+                    "wall_time": round(wall_time, 3),
+                    "cpu_time": round(cpu_time, 3),
+                    "realtime_factor": round(duration / wall_time, 3),
+                    "output_size": output_size,
+                }
+            )
+            self.stderr.write(
+                f"{size[0]}x{size[1]} {duration}s {name} {preset}/{threads} threads: "
+                f"{wall_time:.1f}s wall, {duration / wall_time:.2f}x realtime"
+            )
+        return results
+
+    def run_timed(self, cmd):
+        """
+        Runs an FFmpeg command and measures its wall time and the CPU time (user and
+        system) it used across all threads.
+        """
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.monotonic()
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"FFmpeg error: {e.stderr}") from e
+        wall_time = time.monotonic() - started
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu_time = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+        return wall_time, cpu_time
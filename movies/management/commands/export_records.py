@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from movie_town_backend.utils import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    EXPORT_MODELS,
+    export_model,
+    export_queryset,
+)
+
+
+class Command(BaseCommand):
+    help = "Streams all movies or users to a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(EXPORT_MODELS))
+        parser.add_argument("output", help="The file to write.")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f"Rows fetched per database round trip (default: {EXPORT_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        count = export_queryset(
+            export_model(options["model"]).objects.all(),
+            options["output"],
+            options["format"],
+            options["chunk_size"],
+        )
+        self.stdout.write(f"{count} {options['model']} exported to {options['output']}.")
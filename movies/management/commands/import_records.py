@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+import django_rq
+
+from movie_town_backend.utils import (
+    EXPORT_FORMATS,
+    EXPORT_MODELS,
+    IMPORT_BATCH_SIZE,
+    import_job,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads a CSV or JSON Lines export of movies or users with batched bulk "
+        "inserts and updates. Rows are matched on their primary key."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(EXPORT_MODELS))
+        parser.add_argument("input", help="The file to read.")
+        parser.add_argument(
+            "--format",
+            choices=EXPORT_FORMATS,
+            help="Defaults to the extension of the input file.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f"Rows written per transaction (default: {IMPORT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Run the import as an RQ job on the default queue.",
+        )
+
+    def handle(self, *args, **options):
+        job_args = (
+            options["model"],
+            options["input"],
+            options["format"],
+            options["batch_size"],
+        )
+        if options["background"]:
+            job = django_rq.get_queue("default").enqueue(
+                import_job, *job_args, job_timeout=60 * 60
+            )
+            self.stdout.write(f"Import queued as job {job.id}.")
+            return
+
+        created, updated = import_job(*job_args)
+        self.stdout.write(f"{created} created, {updated} updated.")
@@ -0,0 +1,80 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movies.models import Movie, UploadSession
+from movies.signing import SERVED_DIRECTORIES, media_scope
+from movies.tasks import remove_media
+from movies.uploads import remove_upload_sessions, stale_upload_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Removes upload sessions untouched for UPLOAD_SESSION_TTL seconds, then media "
+        "files under MEDIA_ROOT that no movie or upload session refers to. Meant to "
+        "run periodically, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=24 * 60 * 60,
+            help="Only remove entries untouched for this many seconds (default: 86400).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the stale upload sessions and orphans without removing them.",
+        )
+
+    def handle(self, *args, **options):
+        stale = list(stale_upload_sessions())
+        for session in stale:
+            self.stdout.write(f"upload session {session.id}: {session.path}")
+        if options["dry_run"]:
+            self.stdout.write(f"{len(stale)} stale upload sessions found.")
+        else:
+            removed = remove_upload_sessions(stale)
+            self.stdout.write(f"{removed} stale upload sessions removed.")
+
+        referenced = self.referenced_scopes()
+        cutoff = time.time() - options["min_age"]
+
+        orphans = []
+        for directory in sorted(SERVED_DIRECTORIES):
+            full_directory = os.path.join(settings.MEDIA_ROOT, directory)
+            if not os.path.isdir(full_directory):
+                continue
+            # One scandir per media directory; the entries carry their own stat data.
+            with os.scandir(full_directory) as entries:
+                for entry in entries:
+                    if media_scope(f"{directory}/{entry.name}") in referenced:
+                        continue
+                    if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                        # Possibly a file a running job or request is still writing.
+                        continue
+                    orphans.append(entry.path)
+
+        for path in orphans:
+            self.stdout.write(os.path.relpath(path, settings.MEDIA_ROOT))
+        if options["dry_run"]:
+            self.stdout.write(f"{len(orphans)} orphaned entries found.")
+            return
+        removed = remove_media(orphans)
+        self.stdout.write(f"{removed} orphaned entries removed.")
+
+    def referenced_scopes(self):
+        """
+        Return the media scopes (see `movies.signing.media_scope`) of every file the
+        database refers to, read with one query per model.
+        """
+        names = []
+        for row in Movie.objects.values_list(
+            "video_file", "thumbnail_file", "preview_sprite_file", "preview_vtt_file"
+        ).iterator():
+            names += [name for name in row if name]
+        names += UploadSession.objects.values_list("path", flat=True)
+        return {media_scope(name) for name in names}
@@ -0,0 +1,232 @@
+import mimetypes
+import os
+import re
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.views import APIView
+
+from .models import Movie
+from .signing import media_scope, verify_media_signature
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+RANGE_READ_SIZE = 64 * 1024
+
+
+def media_movies(name):
+    """
+    Return the movies a media file belongs to.
+
+    Renditions, HLS directories and previews are named after the source video, so
+    the owning movies are found from the stem of the first path component. Files
+    shared through a content-addressed blob belong to every movie using the blob.
+
+    Args:
+        name (str): The storage name of the file, relative to `MEDIA_ROOT`.
+
+    Returns:
+        QuerySet: The matching movies; empty for files that are never served.
+    """
+    scope = media_scope(name)
+    if scope is None:
+        return Movie.objects.none()
+
+    # Both lookups are index scans (see `Movie.Meta.indexes`).
+    directory, stem = scope.split("/", 1)
+    match = Q(video_file__startswith=f"videos/{stem}.")
+    if directory == "thumbnails":
+        match |= Q(thumbnail_file=name)
+    return Movie.objects.filter(match)
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range `Range` header.
+
+    Args:
+        header (str): The value of the `Range` header.
+        size (int): The size of the file in bytes.
+
+    Returns:
+        tuple: `(start, end)` with an inclusive end, or None when the range cannot be
+        satisfied. Multiple ranges are not supported and are treated as unsatisfiable.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        # A suffix range: the last `end` bytes.
+        length = min(int(end), size)
+        return (size - length, size - 1) if length else None
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+def read_range(file, length):
+    """
+    Yield `length` bytes from the current position of an open file.
+    """
+    try:
+        while length > 0:
+            chunk = file.read(min(RANGE_READ_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+class MediaFile(APIView):
+    """
+    Serve uploaded videos, renditions, HLS segments and thumbnails.
+
+    Access follows the owning movie: files of public movies are served to everyone,
+    files of private movies only to their owner. Once access is granted the bytes are
+    handed to the front proxy (`X-Accel-Redirect` for nginx, `X-Sendfile` for Apache),
+    which also answers Range requests. Without a proxy the file is returned with a
+    `FileResponse` so the WSGI server can use `sendfile`.
+
+    Signed URLs (`s/<expires>/<signature>/<name>`, see `movies.signing`) are checked
+    without a database query and may be cached by shared caches until they expire.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return a media file, honouring `Range`, `If-Range` and conditional headers.
+
+        Args:
+            request: The HTTP request object.
+            **kwargs: Additional keyword arguments, including the file `name` and,
+                for signed URLs, `expires` and `signature`.
+
+        Returns:
+            HttpResponse: The file, a `206` partial response, a `304`, a `403` for
+            invalid or expired signatures, or a `404` for missing files and files the
+            user may not read.
+        """
+        name = kwargs.get("name")
+        try:
+            path = safe_join(settings.MEDIA_ROOT, name)
+        except ValueError:
+            raise Http404
+        name = os.path.relpath(path, settings.MEDIA_ROOT)
+
+        expires = kwargs.get("expires")
+        if expires is not None:
+            if not verify_media_signature(name, expires, kwargs.get("signature")):
+                return HttpResponseForbidden()
+            max_age = max(0, expires - int(time.time()))
+            cache_control = f"public, max-age={max_age}"
+        else:
+            accesses = self.readable_accesses(request, name)
+            if not accesses:
+                # Private files are reported as missing so their names do not leak.
+                raise Http404
+            cache_control = "public" if "public" in accesses else "private"
+        if not os.path.isfile(path):
+            raise Http404
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            response["ETag"] = etag
+            return response
+
+        backend = settings.MEDIA_SENDFILE_BACKEND
+        if backend == "nginx":
+            response = HttpResponse()
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + name
+        elif backend == "apache":
+            response = HttpResponse()
+            response["X-Sendfile"] = path
+        else:
+            response = self.file_response(
+                request, path, stat.st_size, etag, last_modified
+            )
+
+        content_type, encoding = mimetypes.guess_type(path)
+        response["Content-Type"] = content_type or "application/octet-stream"
+        if encoding:
+            response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Accept-Ranges"] = "bytes"
+        response["Cache-Control"] = cache_control
+        return response
+
+    def readable_accesses(self, request, name):
+        """
+        Return the access levels of the movies owning `name` that the user may read.
+        """
+        movies = media_movies(name)
+        if request.user.is_authenticated:
+            movies = movies.filter(Q(access="public") | Q(user=request.user))
+        else:
+            movies = movies.filter(access="public")
+        return set(movies.values_list("access", flat=True))
+
+    def file_response(self, request, path, size, etag, last_modified):
+        """
+        Build the response when no front proxy takes over the transfer.
+
+        Open-ended ranges (`bytes=N-`, what players send while seeking) pass the open
+        file on so the WSGI server can `sendfile` from the offset; bounded ranges are
+        streamed in chunks.
+
+        Args:
+            request: The HTTP request object.
+            path (str): The absolute path of the file.
+            size (int): The size of the file in bytes.
+            etag (str): The ETag of the file, checked against `If-Range`.
+            last_modified (int): The modification timestamp, checked against `If-Range`.
+
+        Returns:
+            HttpResponse: A `200`, `206` or `416` response.
+        """
+        range_header = request.META.get("HTTP_RANGE")
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if range_header and if_range and if_range != etag:
+            # A stale If-Range asks for the whole, current file instead.
+            if parse_http_date_safe(if_range) != last_modified:
+                range_header = None
+
+        if not range_header:
+            return FileResponse(open(path, "rb"))
+
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            response = HttpResponse(
+                status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+            )
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        start, end = byte_range
+        length = end - start + 1
+        file = open(path, "rb")
+        file.seek(start)
+        if end == size - 1:
+            response = FileResponse(file, status=status.HTTP_206_PARTIAL_CONTENT)
+        else:
+            response = FileResponse(
+                read_range(file, length), status=status.HTTP_206_PARTIAL_CONTENT
+            )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return response
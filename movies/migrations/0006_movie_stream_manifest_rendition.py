@@ -0,0 +1,68 @@
+# Generated by Django 4.2.13 on 2026-10-18 09:12
+
+import os
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_existing_renditions(apps, schema_editor):
+    """
+    Create Rendition rows for the `<stem>_<resolution>` files converted before
+    renditions were tracked in the database (e.g. by `convert_720p`).
+    """
+    Movie = apps.get_model("movies", "Movie")
+    Rendition = apps.get_model("movies", "Rendition")
+
+    renditions = []
+    for movie_id, video_file in (
+        Movie.objects.exclude(video_file="").values_list("id", "video_file").iterator()
+    ):
+        base_name, ext = os.path.splitext(video_file)
+        for resolution in ("480p", "720p", "1080p"):
+            path = f"{base_name}_{resolution}{ext}"
+            full_path = os.path.join(settings.MEDIA_ROOT, path)
+            if os.path.isfile(full_path):
+                renditions.append(
+                    Rendition(
+                        movie_id=movie_id,
+                        resolution=resolution,
+                        path=path,
+                        bytes=os.path.getsize(full_path),
+                        ready=True,
+                    )
+                )
+    Rendition.objects.bulk_create(renditions, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_alter_movie_genre'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='stream_manifest',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='Rendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=255)),
+                ('bytes', models.BigIntegerField(blank=True, null=True)),
+                ('bitrate', models.IntegerField(blank=True, null=True)),
+                ('ready', models.BooleanField(default=False)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='movies.movie')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='rendition',
+            constraint=models.UniqueConstraint(fields=('movie', 'resolution'), name='unique_movie_resolution'),
+        ),
+        migrations.RunPython(record_existing_renditions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.13 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+def mark_existing_thumbnails_ready(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    Movie.objects.exclude(thumbnail_file="").exclude(thumbnail_file=None).update(
+        thumbnail_state="ready"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_movie_stream_manifest_rendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='thumbnail_state',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_thumbnails_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_movie_thumbnail_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='preview_sprite_file',
+            field=models.ImageField(blank=True, null=True, upload_to='thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='preview_vtt_file',
+            field=models.FileField(blank=True, null=True, upload_to='thumbnails/'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_movie_preview_sprite_file_movie_preview_vtt_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['access', '-created_at', '-id'], name='movie_access_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['user', 'access', '-created_at', '-id'], name='movie_user_access_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre', 'access', '-created_at', '-id'], name='movie_genre_access_created_idx'),
+        ),
+    ]
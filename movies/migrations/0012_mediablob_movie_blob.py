@@ -0,0 +1,36 @@
+# Generated by Django 4.2.13 on 2026-10-18 14:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+import movies.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('path', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movies', to='movies.mediablob'),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='video_file',
+            field=models.FileField(blank=True, null=True, storage=movies.storage.ContentAddressedStorage(), upload_to='videos'),
+        ),
+    ]
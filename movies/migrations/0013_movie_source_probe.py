@@ -0,0 +1,38 @@
+# Generated by Django 4.2.13 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_mediablob_movie_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='source_codec',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='source_width',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='source_height',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='source_bitrate',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
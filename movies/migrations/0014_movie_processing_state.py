@@ -0,0 +1,29 @@
+# Generated by Django 4.2.13 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+def mark_existing_movies_ready(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    Movie.objects.update(processing_state="ready")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_movie_source_probe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='processing_state',
+            field=models.CharField(choices=[('queued', 'Queued'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='queued', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='processing_job_id',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(mark_existing_movies_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.13 on 2026-10-18 17:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0014_movie_processing_state'),
+    ]
+
+    # Django 4.2 has no GeneratedField, so the column lives outside the model and is
+    # maintained by Postgres on every insert and update (see movies.search).
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE movies_movie ADD COLUMN search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+                ) STORED;
+                CREATE INDEX movie_search_vector_idx
+                    ON movies_movie USING GIN (search_vector);
+            """,
+            reverse_sql="""
+                DROP INDEX movie_search_vector_idx;
+                ALTER TABLE movies_movie DROP COLUMN search_vector;
+            """,
+        ),
+    ]
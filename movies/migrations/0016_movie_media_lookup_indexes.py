@@ -0,0 +1,21 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0015_movie_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['video_file'], name='movie_video_file_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['thumbnail_file'], name='movie_thumbnail_file_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0016_movie_media_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='state',
+            field=models.CharField(choices=[('uploading', 'Uploading'), ('committing', 'Committing'), ('committed', 'Committed'), ('failed', 'Failed')], default='uploading', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='details',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='movie',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='movies.movie'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0018_uploadsession_updated_at'),
+    ]
+
+    # Prefix queries are matched against unstemmed ('simple') lexemes: a stemmed
+    # vector stores "happi" for "happiness", which the prefix "happin:*" never
+    # matches. The English lexemes are kept alongside for whole-word matches.
+    # Postgres cannot change a generated column's expression, so it is rebuilt.
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                DROP INDEX movie_search_vector_idx;
+                ALTER TABLE movies_movie DROP COLUMN search_vector;
+                ALTER TABLE movies_movie ADD COLUMN search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+                    || setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+                    || setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+                ) STORED;
+                CREATE INDEX movie_search_vector_idx
+                    ON movies_movie USING GIN (search_vector);
+            """,
+            reverse_sql="""
+                DROP INDEX movie_search_vector_idx;
+                ALTER TABLE movies_movie DROP COLUMN search_vector;
+                ALTER TABLE movies_movie ADD COLUMN search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+                ) STORED;
+                CREATE INDEX movie_search_vector_idx
+                    ON movies_movie USING GIN (search_vector);
+            """,
+        ),
+    ]
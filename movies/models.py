@@ -1,7 +1,9 @@
+import uuid
 from datetime import date
 from django.db import models
 
 from user.models import CustomUser
+from .storage import ContentAddressedStorage
 
 # Create your models here.
 
@@ -19,16 +21,168 @@ class Movie(models.Model):
         ("private", "Private"),
     ]
 
+    PROCESSING_STATES = [
+        ("queued", "Queued"),
+        ("processing", "Processing"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
+    THUMBNAIL_STATES = [
+        ("pending", "Pending"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
     created_at = models.DateField(default=date.today)
+    updated_at = models.DateTimeField(auto_now=True)
     title = models.CharField(max_length=50)
     description = models.CharField(max_length=150)
-    video_file = models.FileField(upload_to="videos", blank=True, null=True)
+    video_file = models.FileField(
+        upload_to="videos", storage=ContentAddressedStorage(), blank=True, null=True
+    )
+    blob = models.ForeignKey(
+        "MediaBlob", on_delete=models.PROTECT, related_name="movies", blank=True, null=True
+    )
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     thumbnail_file = models.ImageField(upload_to="thumbnails/", blank=True, null=True)
+    preview_sprite_file = models.ImageField(upload_to="thumbnails/", blank=True, null=True)
+    preview_vtt_file = models.FileField(upload_to="thumbnails/", blank=True, null=True)
+    thumbnail_state = models.CharField(
+        max_length=10, choices=THUMBNAIL_STATES, default="pending"
+    )
     genre = models.CharField(max_length=20, choices=GENRE_OPTIONS, default="nature")
     access = models.CharField(max_length=10, choices=ACCESS_OPTIONS, default="private")
+    stream_manifest = models.CharField(max_length=255, blank=True)
+    processing_state = models.CharField(
+        max_length=10, choices=PROCESSING_STATES, default="queued"
+    )
+    # The RQ job currently transcoding the movie, for progress lookups.
+    processing_job_id = models.CharField(max_length=64, blank=True)
+    # Properties of the uploaded source as read by ffprobe; bitrate in bits per second.
+    duration = models.FloatField(null=True, blank=True)
+    source_codec = models.CharField(max_length=20, blank=True)
+    source_width = models.IntegerField(null=True, blank=True)
+    source_height = models.IntegerField(null=True, blank=True)
+    source_bitrate = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        # Back the keyset-paginated listing: public movies, a user's private movies
+        # and the genre filter, each walked in (created_at, id) order.
+        indexes = [
+            models.Index(
+                fields=["access", "-created_at", "-id"],
+                name="movie_access_created_idx",
+            ),
+            models.Index(
+                fields=["user", "access", "-created_at", "-id"],
+                name="movie_user_access_created_idx",
+            ),
+            models.Index(
+                fields=["genre", "access", "-created_at", "-id"],
+                name="movie_genre_access_created_idx",
+            ),
+            # Back the media access check (`movies.media.media_movies`), a prefix
+            # match on the source name plus an exact match on the thumbnail.
+            models.Index(
+                fields=["video_file"],
+                name="movie_video_file_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            models.Index(fields=["thumbnail_file"], name="movie_thumbnail_file_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored access so signal handlers can tell if a movie stopped
+        # being public and invalidate the public listing cache.
+        instance._loaded_access = instance.__dict__.get("access")
+        return instance
 
     def __str__(self):
         return self.title
+
+
+class MediaBlob(models.Model):
+    """
+    A stored source file, identified by the SHA-256 of its content.
+
+    Every movie uploaded with the same content points at the same blob, and
+    `ref_count` counts those movies. Files are only removed once the last movie
+    referencing the blob is deleted.
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
+class Rendition(models.Model):
+    """
+    A transcoded variant of a movie's video file.
+
+    Rows are written by the transcode task once FFmpeg has finished, so serializers
+    can list the available renditions without probing the filesystem.
+    `path` is relative to `MEDIA_ROOT`, `bitrate` is in bits per second.
+    """
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="renditions")
+    resolution = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    bytes = models.BigIntegerField(null=True, blank=True)
+    bitrate = models.IntegerField(null=True, blank=True)
+    ready = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["movie", "resolution"], name="unique_movie_resolution"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.movie} ({self.resolution})"
     
     
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload in progress.
+
+    Chunks are written straight into `path` (relative to `MEDIA_ROOT`); `offset` is the
+    number of bytes received so far. A committed upload is hashed and turned into a
+    `Movie` by a background job, using the movie fields kept in `details`; `movie`
+    points at the result. Sessions untouched for `UPLOAD_SESSION_TTL` seconds are
+    removed with their file by `sweep_media`.
+    """
+
+    STATES = [
+        ("uploading", "Uploading"),
+        ("committing", "Committing"),
+        ("committed", "Committed"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    state = models.CharField(max_length=10, choices=STATES, default="uploading")
+    details = models.JSONField(default=dict, blank=True)
+    movie = models.ForeignKey(
+        Movie, on_delete=models.SET_NULL, related_name="+", blank=True, null=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
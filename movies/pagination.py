@@ -0,0 +1,105 @@
+import base64
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(created_at, pk):
+    """
+    Encode the position of a movie in the listing as an opaque cursor.
+
+    Args:
+        created_at (date): The `created_at` value of the last movie on a page.
+        pk (int): The primary key of the last movie on a page.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor string from the query parameters.
+
+    Returns:
+        tuple: The `(created_at, pk)` position the cursor points at.
+
+    Raises:
+        NotFound: If the cursor is malformed.
+    """
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise NotFound("Invalid cursor.")
+
+
+class MovieCursorPagination:
+    """
+    Keyset pagination over movies ordered by `(created_at, id)`, newest first.
+
+    Each page continues strictly after the last `(created_at, id)` pair of the previous
+    page, so fetching a page costs one index range scan regardless of how deep into
+    the listing the client is. The page size can be set with `page_size` up to
+    `VIDEO_MAX_PAGE_SIZE`.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering = ("-created_at", "-id")
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, "VIDEO_PAGE_SIZE", 20)
+        max_page_size = getattr(settings, "VIDEO_MAX_PAGE_SIZE", 100)
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, page_size))
+        except ValueError:
+            pass
+        return max(1, min(page_size, max_page_size))
+
+    def paginate_queryset(self, queryset, request):
+        """
+        Return the movies of the page requested by `request`.
+
+        Args:
+            queryset (QuerySet): The movies visible to the client.
+            request (Request): The HTTP request carrying `cursor` and `page_size`.
+
+        Returns:
+            list: The movies on the requested page.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        page = list(queryset.order_by(*self.ordering)[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[: self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, encode_cursor(last.created_at, last.pk)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
@@ -0,0 +1,301 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+import django_rq
+from rq import Retry, get_current_job
+
+from .models import Movie
+from .tasks import (
+    concat_segments,
+    generate_thumbnail,
+    mark_processing,
+    package_hls,
+    probe_keyframes,
+    probe_video,
+    remove_media,
+    remux_resolutions,
+    record_processing_failure,
+    record_thumbnail_failure,
+    rendition_ladder,
+    split_source,
+    store_probe,
+    update_shared_movies,
+    transcode_renditions,
+    transcode_segment,
+)
+
+
+CLEANUP_KEY = "media:cleanup"
+CLEANUP_SCHEDULED_KEY = "media:cleanup:scheduled"
+# Paths removed per `remove_pending_media` job.
+CLEANUP_BATCH_SIZE = 1000
+
+
+def schedule_media_cleanup(paths):
+    """
+    Queue media paths for removal once the current transaction commits.
+
+    The paths are pushed onto a Redis list on commit, and a single
+    `remove_pending_media` job removes everything queued until it runs, so deleting
+    many movies at once, such as those of a deleted user, costs one job. Nothing is
+    queued when the transaction rolls back.
+
+    Args:
+        paths (list): Absolute paths of files and directories to remove.
+    """
+    if paths:
+        transaction.on_commit(lambda: queue_media_cleanup(paths))
+
+
+def queue_media_cleanup(paths):
+    """
+    Add paths to the cleanup list and make sure a removal job is scheduled.
+    """
+    redis = django_rq.get_connection("default")
+    redis.rpush(CLEANUP_KEY, *paths)
+    if redis.set(CLEANUP_SCHEDULED_KEY, 1, nx=True, ex=60 * 60):
+        django_rq.get_queue("default").enqueue(remove_pending_media)
+
+
+def remove_pending_media():
+    """
+    Remove the media paths queued by `schedule_media_cleanup`.
+
+    Runs as an RQ job. At most `CLEANUP_BATCH_SIZE` paths are removed per job; the
+    rest is handed to a fresh job.
+
+    Returns:
+        int: The number of paths removed, see `remove_media`.
+    """
+    redis = django_rq.get_connection("default")
+    # Paths queued from now on schedule a new job.
+    redis.delete(CLEANUP_SCHEDULED_KEY)
+
+    pipe = redis.pipeline()
+    pipe.lrange(CLEANUP_KEY, 0, CLEANUP_BATCH_SIZE - 1)
+    pipe.ltrim(CLEANUP_KEY, CLEANUP_BATCH_SIZE, -1)
+    paths, _ = pipe.execute()
+    removed = remove_media([path.decode() for path in paths])
+
+    if redis.llen(CLEANUP_KEY) and redis.set(
+        CLEANUP_SCHEDULED_KEY, 1, nx=True, ex=60 * 60
+    ):
+        django_rq.get_queue("default").enqueue(remove_pending_media)
+    return removed
+
+
+def transcode_timeout(duration):
+    """
+    Return the RQ timeout for transcoding a source of the given duration.
+
+    Args:
+        duration (float): The duration of the source video in seconds.
+
+    Returns:
+        int: The job timeout in seconds, never below `TRANSCODE_MIN_TIMEOUT`.
+    """
+    factor = getattr(settings, "TRANSCODE_TIMEOUT_FACTOR", 3)
+    minimum = getattr(settings, "TRANSCODE_MIN_TIMEOUT", 360)
+    return max(minimum, int(duration * factor))
+
+
+def thumbnail_timeout(duration):
+    """
+    Return the RQ timeout for generating the thumbnail and previews of a source.
+
+    Args:
+        duration (float): The duration of the source video in seconds.
+
+    Returns:
+        int: The job timeout in seconds, never below `THUMBNAIL_MIN_TIMEOUT`.
+    """
+    factor = getattr(settings, "THUMBNAIL_TIMEOUT_FACTOR", 1)
+    minimum = getattr(settings, "THUMBNAIL_MIN_TIMEOUT", 300)
+    return max(minimum, int(duration * factor))
+
+
+def transcode_queue_name(duration):
+    """
+    Pick the transcode queue for a source of the given duration.
+
+    Long sources go to `transcode_heavy`, and sources encoded in segments to
+    `transcode_segments`, so they cannot hold up the short ones waiting in
+    `transcode_fast`.
+
+    Args:
+        duration (float): The duration of the source video in seconds.
+
+    Returns:
+        str: The name of the RQ queue.
+    """
+    if duration >= getattr(settings, "SEGMENT_TRANSCODE_MIN_DURATION", 1200):
+        return "transcode_segments"
+    if duration >= getattr(settings, "TRANSCODE_HEAVY_MIN_DURATION", 600):
+        return "transcode_heavy"
+    return "transcode_fast"
+
+
+def enqueue_media_processing(movie):
+    """
+    Start processing a newly uploaded movie once its row is committed.
+
+    Only a `start_media_processing` job is enqueued, on the `thumbnails` queue, so
+    the upload request never waits for ffprobe and no worker can pick up a job for
+    a row that is not committed yet.
+
+    Args:
+        movie (Movie): The movie that was just created.
+    """
+    if movie.thumbnail_file.name:
+        Movie.objects.filter(pk=movie.pk).update(
+            thumbnail_state="ready", updated_at=timezone.now()
+        )
+    movie_id = movie.pk
+    transaction.on_commit(
+        lambda: django_rq.get_queue("thumbnails").enqueue(
+            start_media_processing, movie_id, on_failure=record_start_failure
+        )
+    )
+
+
+def record_start_failure(job, connection, type, value, traceback):
+    """
+    RQ failure callback of `start_media_processing`.
+
+    No processing job was enqueued, so the movie and a pending thumbnail are marked
+    `failed`.
+    """
+    Movie.objects.filter(pk=job.args[0], thumbnail_state="pending").update(
+        thumbnail_state="failed", updated_at=timezone.now()
+    )
+    record_processing_failure(job, connection, type, value, traceback)
+
+
+def start_media_processing(movie_id):
+    """
+    Enqueue the thumbnail, transcode and packaging jobs of a newly uploaded movie.
+
+    Runs as an RQ job. Thumbnails go to their own queue so they are never stuck
+    behind encodes. The source is probed with ffprobe (a header read) first, to give
+    the thumbnail and transcode jobs timeouts proportional to its duration and to
+    route the transcode by length; the probe is stored on the movie. A processing
+    job that fails for good marks the movie `failed`.
+
+    Args:
+        movie_id (int): The primary key of the movie.
+    """
+    movie = Movie.objects.get(pk=movie_id)
+    try:
+        source = probe_video(movie.video_file.path)
+    except RuntimeError:
+        # Let the jobs themselves report the unreadable source.
+        duration = 0
+    else:
+        store_probe(movie, source)
+        duration = source["duration"]
+
+    if movie.thumbnail_state == "pending":
+        django_rq.get_queue("thumbnails").enqueue(
+            generate_thumbnail,
+            movie.pk,
+            job_timeout=thumbnail_timeout(duration),
+            on_failure=record_thumbnail_failure,
+        )
+
+    timeout = transcode_timeout(duration)
+    queue = django_rq.get_queue(transcode_queue_name(duration))
+    if queue.name == "transcode_segments":
+        queue.enqueue(
+            transcode_in_segments,
+            movie.pk,
+            job_timeout=timeout,
+            # The job is kept while its segments run, see `transcode_in_segments`.
+            result_ttl=timeout,
+            on_failure=record_processing_failure,
+        )
+        return
+
+    transcode_job = queue.enqueue(
+        transcode_renditions,
+        movie.pk,
+        job_timeout=timeout,
+        on_failure=record_processing_failure,
+    )
+    queue.enqueue(
+        package_hls,
+        movie.pk,
+        depends_on=transcode_job,
+        job_timeout=timeout,
+        on_failure=record_processing_failure,
+    )
+
+
+def transcode_in_segments(movie_id):
+    """
+    Split a long movie into segments and fan their encodes out over the RQ workers.
+
+    Runs as an RQ job. Every segment becomes its own `transcode_segment` job on the
+    `transcode_segments` queue, retried on its own if it fails. A `concat_segments`
+    job depending on all of them joins the results into the final renditions,
+    followed by HLS packaging. Once any of these jobs fails for good the movie is
+    marked `failed`, as the jobs depending on it never run.
+
+    The ids of the segment jobs are stored under `segment_jobs` in this job's meta,
+    and `VideoStatus` combines their progress until `concat_segments` starts.
+
+    Args:
+        movie_id (int): The primary key of the movie.
+
+    Returns:
+        list: The paths of the source segments.
+    """
+    movie = Movie.objects.get(pk=movie_id)
+    mark_processing(movie)
+    source_path = movie.video_file.path
+    try:
+        source = probe_video(source_path)
+    except RuntimeError:
+        update_shared_movies(movie, processing_state="failed")
+        raise
+    ladder = rendition_ladder(source["height"])
+    remux = remux_resolutions(source, ladder, probe_keyframes(source_path))
+    segment_seconds = getattr(settings, "SEGMENT_TRANSCODE_SECONDS", 120)
+    segment_paths = split_source(source_path, segment_seconds)
+
+    queue = django_rq.get_queue("transcode_segments")
+    segment_jobs = [
+        queue.enqueue(
+            transcode_segment,
+            movie_id,
+            segment_path,
+            ladder,
+            remux,
+            segment_seconds,
+            job_timeout=transcode_timeout(segment_seconds),
+            retry=Retry(max=3, interval=[30, 120, 300]),
+            on_failure=record_processing_failure,
+        )
+        for segment_path in segment_paths
+    ]
+    job = get_current_job()
+    if job is not None:
+        job.meta["segment_jobs"] = [segment_job.id for segment_job in segment_jobs]
+        job.save_meta()
+    timeout = transcode_timeout(source["duration"])
+    concat_job = queue.enqueue(
+        concat_segments,
+        movie_id,
+        ladder,
+        segment_paths,
+        depends_on=segment_jobs,
+        job_timeout=timeout,
+        on_failure=record_processing_failure,
+    )
+    queue.enqueue(
+        package_hls,
+        movie_id,
+        depends_on=concat_job,
+        job_timeout=timeout,
+        on_failure=record_processing_failure,
+    )
+    return segment_paths
@@ -0,0 +1,54 @@
+import re
+
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+# Queries are parsed without stemming and matched against the unstemmed lexemes of
+# `search_vector`, so a partly typed word matches as a prefix (see migration 0019).
+SEARCH_CONFIG = "simple"
+# Longest number of words of a query; more only make the tsquery slower.
+MAX_SEARCH_TERMS = 8
+
+MATCH_SQL = '"movies_movie"."search_vector" @@ to_tsquery(%s::regconfig, %s)'
+RANK_SQL = 'ts_rank_cd("movies_movie"."search_vector", to_tsquery(%s::regconfig, %s))'
+
+
+def prefix_tsquery(text):
+    """
+    Turn free text into a tsquery matching every word as a prefix.
+
+    Only word characters are kept, so user input cannot inject tsquery operators.
+
+    Args:
+        text (str): The search text, e.g. `star wa`.
+
+    Returns:
+        str: A tsquery such as `star:* & wa:*`, or an empty string if no words remain.
+    """
+    terms = re.findall(r"\w+", text.lower())[:MAX_SEARCH_TERMS]
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def search_movies(movies, text):
+    """
+    Narrow a queryset to the movies matching `text`, best matches first.
+
+    Matching uses the GIN-indexed `search_vector` column (title weighted above
+    description, see migrations 0015 and 0019), so the cost follows the number of
+    matches, not the size of the catalogue.
+
+    Args:
+        movies (QuerySet): The movies the request may see.
+        text (str): The search text.
+
+    Returns:
+        QuerySet: The matching movies annotated with `rank`.
+    """
+    query = prefix_tsquery(text)
+    params = [SEARCH_CONFIG, query]
+    return (
+        movies.alias(matches=RawSQL(MATCH_SQL, params, output_field=BooleanField()))
+        .filter(matches=True)
+        .annotate(rank=RawSQL(RANK_SQL, params, output_field=FloatField()))
+        .order_by("-rank", "-created_at", "-id")
+    )
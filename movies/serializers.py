@@ -1,18 +1,56 @@
 from rest_framework import serializers
 
 from .models import Movie
+from .signing import signed_media_url
 from django.conf import settings
-import os
+
+# File fields whose URLs are signed for private movies.
+SIGNED_FILE_FIELDS = [
+    "video_file",
+    "thumbnail_file",
+    "preview_sprite_file",
+    "preview_vtt_file",
+]
 
 
 class MovieSerializer(serializers.ModelSerializer):
     video_480p_url = serializers.SerializerMethodField()
     video_720p_url = serializers.SerializerMethodField()
     video_1080p_url = serializers.SerializerMethodField()
+    stream_manifest_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Movie
         fields = "__all__"
+        read_only_fields = [
+            "stream_manifest",
+            "processing_state",
+            "processing_job_id",
+            "blob",
+            "duration",
+            "source_codec",
+            "source_width",
+            "source_height",
+            "source_bitrate",
+            "thumbnail_state",
+            "preview_sprite_file",
+            "preview_vtt_file",
+        ]
+
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
+        if obj.access == "private":
+            for field in SIGNED_FILE_FIELDS:
+                file = getattr(obj, field)
+                if file:
+                    data[field] = self.media_url(obj, file.name)
+        return data
+
+    def media_url(self, obj, name):
+        # Private files get signed, expiring URLs that need no session to fetch.
+        if obj.access == "private":
+            return signed_media_url(name)
+        return settings.MEDIA_URL + name
 
     def get_video_480p_url(self, obj):
         return self.get_video_resolution_url(obj, "480p")
@@ -23,15 +61,16 @@ class MovieSerializer(serializers.ModelSerializer):
     def get_video_1080p_url(self, obj):
         return self.get_video_resolution_url(obj, "1080p")
 
+    def get_stream_manifest_url(self, obj):
+        if obj.stream_manifest:
+            return self.media_url(obj, obj.stream_manifest)
+
+        return None
+
     def get_video_resolution_url(self, obj, resolution):
-        if obj.video_file:
-            video_path = obj.video_file.path
-            base_name, ext = os.path.splitext(video_path)
-            resolution_video_path = f"{base_name}_{resolution}{ext}"
-
-            if os.path.exists(resolution_video_path):
-                return settings.MEDIA_URL + os.path.relpath(
-                    resolution_video_path, settings.MEDIA_ROOT
-                )
+        # Reads the prefetched renditions so listings never touch the filesystem.
+        for rendition in obj.renditions.all():
+            if rendition.resolution == resolution and rendition.ready:
+                return self.media_url(obj, rendition.path)
 
         return None
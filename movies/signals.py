@@ -1,38 +1,88 @@
-import os
 from django.dispatch import receiver
-from .tasks import (
-    convert_720p,
-    convert_path,
-    create_thumbnail,
-)
-from .models import Movie
+from .tasks import media_paths, share_processed_media
+from .cache import invalidate_movie
+from .models import MediaBlob, Movie
+from .scheduling import enqueue_media_processing, schedule_media_cleanup
+from .storage import blob_digest
+from django.db import transaction
+from django.db.models import F
 from django.db.models.signals import post_save, post_delete
-from django.conf import settings
-import django_rq
 
 
 
+def attach_blob(movie):
+    """
+    Link a new movie to the `MediaBlob` of its content-addressed source file.
+
+    Args:
+        movie (Movie): The movie that was just created.
+
+    Returns:
+        MediaBlob: The blob, or None if the source file is not content-addressed.
+    """
+    digest = blob_digest(movie.video_file.name) if movie.video_file else None
+    if digest is None:
+        return None
+
+    blob, _ = MediaBlob.objects.get_or_create(
+        sha256=digest,
+        defaults={"path": movie.video_file.name, "size": movie.video_file.size},
+    )
+    MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+    Movie.objects.filter(pk=movie.pk).update(blob=blob)
+    movie.blob = blob
+    return blob
+
+
+def release_blob(blob_id):
+    """
+    Drop one reference to a `MediaBlob` and delete it when none are left.
+
+    Args:
+        blob_id (int): The primary key of the blob.
+
+    Returns:
+        bool: True if the blob is no longer referenced and its files may be removed.
+    """
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return True
+        if blob.ref_count > 1:
+            blob.ref_count -= 1
+            blob.save(update_fields=["ref_count"])
+            return False
+        blob.delete()
+        return True
+
+
 @receiver(post_save, sender=Movie)
 def video_post_save(sender, instance, created, **kwargs):
     if created:
-        if not instance.thumbnail_file.name:
-            thumbnail_path = create_thumbnail(instance.video_file.path)
-            instance.thumbnail_file.name = thumbnail_path[
-                len(settings.MEDIA_ROOT) + 1 :
-            ]
-            instance.save()
-    queue = django_rq.get_queue("default", autocommit=True)
-    queue.enqueue(convert_720p, instance.video_file.path)
+        blob = attach_blob(instance)
+        original = None
+        if blob is not None:
+            original = (
+                Movie.objects.filter(blob=blob)
+                .exclude(pk=instance.pk)
+                .order_by("pk")
+                .first()
+            )
+        if original is not None:
+            # Identical content was uploaded before: reuse its media instead of
+            # transcoding again.
+            share_processed_media(original, instance)
+        else:
+            enqueue_media_processing(instance)
+    invalidate_movie(
+        instance.user_id, instance.access, getattr(instance, "_loaded_access", None)
+    )
 
 
 @receiver(post_delete, sender=Movie)
 def video_post_delete(sender, instance, **kwargs):
-    if instance.video_file:
-        path_720p = convert_path(instance.video_file.path, "720p")
-
-        if os.path.isfile(instance.video_file.path):
-            os.remove(instance.video_file.path)
-            os.remove(instance.thumbnail_file.path)
-            if os.path.isfile(path_720p):
-                os.remove(path_720p)
-          
+    invalidate_movie(instance.user_id, instance.access)
+    if instance.blob_id and not release_blob(instance.blob_id):
+        # Other movies still use the same source file and its derived media.
+        return
+    schedule_media_cleanup(media_paths(instance))
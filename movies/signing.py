@@ -0,0 +1,106 @@
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+SIGNING_SALT = "movies.signing.media"
+
+# Suffixes that derived files add to the stem of their source video.
+DERIVED_SUFFIXES = ("_480p", "_720p", "_1080p", "_hls", "_sprite", "_segments")
+
+# Top-level media directories holding movie files. Everything else under
+# MEDIA_ROOT (pending uploads, segment work files) is never served.
+SERVED_DIRECTORIES = {"videos", "thumbnails"}
+
+
+def media_scope(name):
+    """
+    Return the scope a media file is signed under.
+
+    The scope is `<directory>/<source stem>`: a source video, its renditions and every
+    file of its HLS directory share one scope, as do its thumbnail, sprite and WebVTT
+    index. One signature therefore covers the relative URLs inside playlists and the
+    sprite referenced by the WebVTT file.
+
+    Args:
+        name (str): The storage name of the file, relative to `MEDIA_ROOT`.
+
+    Returns:
+        str: The scope, or None for files outside `SERVED_DIRECTORIES`.
+    """
+    directory, _, rest = name.partition("/")
+    if directory not in SERVED_DIRECTORIES or not rest:
+        return None
+
+    stem = os.path.splitext(rest.split("/", 1)[0])[0]
+    for suffix in DERIVED_SUFFIXES:
+        if stem.endswith(suffix):
+            stem = stem[: -len(suffix)]
+            break
+    return f"{directory}/{stem}"
+
+
+def url_epoch(now=None):
+    """
+    Return the index of the current signing period.
+
+    Every URL signed within one period of `MEDIA_SIGNED_URL_PERIOD` seconds gets the
+    same expiry, so the URLs are identical across requests and stay cacheable.
+    """
+    if now is None:
+        now = time.time()
+    return int(now) // settings.MEDIA_SIGNED_URL_PERIOD
+
+
+def signed_expiry(now=None):
+    """
+    Return the expiry timestamp of URLs signed now.
+
+    URLs stay valid for at least `MEDIA_SIGNED_URL_TTL` seconds, which outlives any
+    cached listing they are embedded in.
+    """
+    period = settings.MEDIA_SIGNED_URL_PERIOD
+    return (url_epoch(now) + 1) * period + settings.MEDIA_SIGNED_URL_TTL
+
+
+def media_signature(scope, expires):
+    return salted_hmac(
+        SIGNING_SALT, f"{scope}:{expires}", algorithm="sha256"
+    ).hexdigest()[:32]
+
+
+def signed_media_url(name, expires=None):
+    """
+    Build a signed, expiring URL for a media file.
+
+    Args:
+        name (str): The storage name of the file, relative to `MEDIA_ROOT`.
+        expires (int, optional): The expiry as a Unix timestamp. Defaults to
+            `signed_expiry()`.
+
+    Returns:
+        str: A URL of the form `<MEDIA_URL>s/<expires>/<signature>/<name>`.
+    """
+    if expires is None:
+        expires = signed_expiry()
+    signature = media_signature(media_scope(name), expires)
+    return f"{settings.MEDIA_URL}s/{expires}/{signature}/{name}"
+
+
+def verify_media_signature(name, expires, signature, now=None):
+    """
+    Check a signed media URL without touching the database.
+
+    Returns:
+        bool: True when the signature matches the file's scope and has not expired.
+    """
+    scope = media_scope(name)
+    if scope is None:
+        return False
+    if now is None:
+        now = time.time()
+    if expires < now:
+        return False
+    return hmac.compare_digest(media_signature(scope, expires), signature)
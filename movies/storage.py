@@ -0,0 +1,92 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def blob_digest(name):
+    """
+    Return the SHA-256 digest a content-addressed file name was derived from.
+
+    Args:
+        name (str): A storage name such as `videos/<sha256>.mp4`.
+
+    Returns:
+        str: The hex digest, or None for files stored before content addressing.
+    """
+    stem = os.path.splitext(os.path.basename(name or ""))[0]
+    return stem if DIGEST_PATTERN.match(stem) else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files after the SHA-256 of their content.
+
+    Uploads are hashed while they are written, then moved to `<dir>/<sha256><ext>`.
+    When a file with the same content is already stored the new copy is discarded,
+    so identical uploads share one source file and, because derived files are named
+    after the source, also share renditions, HLS segments and thumbnails.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content has been hashed in _save.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=full_directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            return self._store(temp_path, directory, digest.hexdigest(), extension)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def adopt(self, name):
+        """
+        Move a file already inside the storage to its content-addressed name.
+
+        Used for files that were assembled in place, such as resumable uploads.
+
+        Args:
+            name (str): The current storage name of the file.
+
+        Returns:
+            str: The content-addressed storage name.
+        """
+        path = self.path(name)
+        digest = hashlib.sha256()
+        with open(path, "rb") as source:
+            for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        extension = os.path.splitext(name)[1].lower()
+        return self._store(path, os.path.dirname(name), digest.hexdigest(), extension)
+
+    def _store(self, path, directory, digest, extension):
+        final_name = os.path.join(directory, f"{digest}{extension}")
+        final_path = self.path(final_name)
+        if os.path.exists(final_path):
+            os.remove(path)
+        else:
+            os.replace(path, final_path)
+            if self.file_permissions_mode is not None:
+                os.chmod(final_path, self.file_permissions_mode)
+        return final_name.replace("\\", "/")
@@ -1,94 +1,1107 @@
+import json
+import shutil
 import subprocess
+import tempfile
+import time
 from django.conf import settings
+from django.utils import timezone
 import os
+from rq import get_current_job
+
+from .cache import invalidate_movie
+from .models import Movie, Rendition
 
 FFMPEG_PATH = "/usr/bin/ffmpeg"
+FFPROBE_PATH = "/usr/bin/ffprobe"
+
+# Renditions produced for every upload as (name, height) pairs, lowest first.
+RENDITIONS = [
+    ("480p", 480),
+    ("720p", 720),
+    ("1080p", 1080),
+]
+
+# Target length of the HLS segments. Renditions get a forced keyframe at every
+# segment boundary so packaging can cut them without re-encoding.
+HLS_SEGMENT_SECONDS = 6
+
+# Seconds at the start of a source whose keyframes are checked before it is remuxed,
+# and how far (in seconds) a keyframe may trail an HLS segment boundary.
+KEYFRAME_PROBE_SECONDS = 60
+KEYFRAME_TOLERANCE = 0.1
+
+# Minimum number of seconds between two progress updates written to the RQ job meta.
+PROGRESS_INTERVAL = 1
 
+# Highest source bitrate (bits per second) a rendition may keep when the source is
+# stream-copied into it instead of being re-encoded.
+RENDITION_MAX_BITRATES = {
+    "480p": 2_500_000,
+    "720p": 5_000_000,
+    "1080p": 8_000_000,
+}
 
-def create_thumbnail(source_path, time="00:00:01", width=640, height=360):
+# Number of frames in the scrub-bar preview sprite and how many tiles go in a row.
+PREVIEW_FRAMES = 100
+PREVIEW_COLUMNS = 10
+
+
+def create_previews(
+    source_path,
+    duration,
+    time=1,
+    width=640,
+    height=360,
+    frames=PREVIEW_FRAMES,
+    columns=PREVIEW_COLUMNS,
+    tile_width=160,
+    tile_height=90,
+):
     """
-    Creates a thumbnail for a given video file.
+    Creates the thumbnail and the scrub-bar preview sprite of a video in one FFmpeg pass.
 
-    This function generates a thumbnail image from the specified video file at a given time,
-    with specified width and height.
+    The source is decoded once and split into two branches: one grabs the poster frame
+    at `time`, the other samples `frames` evenly spaced frames and tiles them into a
+    sprite sheet. A WebVTT file maps each time range to its tile in the sprite.
+    All files are written to `MEDIA_ROOT/thumbnails` and named after the source.
 
     Args:
     - source_path (str): The path to the source video file.
-    - time (str, optional): The timestamp in the video from which to capture the thumbnail. Defaults to "00:00:05".
+    - duration (float): The duration of the source video in seconds.
+    - time (float, optional): The second from which to capture the thumbnail. Defaults to 1.
     - width (int, optional): The width of the thumbnail image. Defaults to 640.
     - height (int, optional): The height of the thumbnail image. Defaults to 360.
+    - frames (int, optional): The number of frames in the sprite. Defaults to `PREVIEW_FRAMES`.
+    - columns (int, optional): The number of tiles per sprite row. Defaults to `PREVIEW_COLUMNS`.
+    - tile_width (int, optional): The width of one sprite tile. Defaults to 160.
+    - tile_height (int, optional): The height of one sprite tile. Defaults to 90.
 
     Returns:
-    - str: The path to the generated thumbnail image.
+    - tuple: The paths to the thumbnail image, the sprite sheet and the WebVTT index.
     """
-
     file_name = os.path.splitext(os.path.basename(source_path))[0]
     thumbnail_dir = os.path.join(settings.MEDIA_ROOT, "thumbnails")
     os.makedirs(thumbnail_dir, exist_ok=True)
     thumbnail_path = os.path.join(thumbnail_dir, f"{file_name}.jpg")
+    sprite_path = os.path.join(thumbnail_dir, f"{file_name}_sprite.jpg")
+    vtt_path = os.path.join(thumbnail_dir, f"{file_name}_sprite.vtt")
 
-    cmd = '{} -y -i "{}" -ss {} -vframes 1 -vf "scale={}:{}" "{}"'.format(
-        FFMPEG_PATH, source_path, time, width, height, thumbnail_path
+    duration = max(duration, 0.1)
+    rows = -(-frames // columns)
+    poster_time = min(time, duration / 2)
+    filter_graph = (
+        "[0:v]split=2[p][s];"
+        f"[p]trim=start={poster_time},setpts=PTS-STARTPTS,scale={width}:{height}[poster];"
+        f"[s]fps={frames / duration:.6f},"
+        f"scale={tile_width}:{tile_height}:force_original_aspect_ratio=decrease,"
+        f"pad={tile_width}:{tile_height}:(ow-iw)/2:(oh-ih)/2,"
+        f"tile={columns}x{rows}[sprite]"
     )
-    
+    cmd = [
+        FFMPEG_PATH,
+        "-y",
+        "-i", source_path,
+        "-filter_complex", filter_graph,
+        "-map", "[poster]", "-frames:v", "1", thumbnail_path,
+        "-map", "[sprite]", "-frames:v", "1", sprite_path,
+    ]
     try:
-        result = subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg command failed with error: {result.stderr}")
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"FFmpeg error: {e.stderr}") from e
-    except Exception as e:
-        raise RuntimeError(f"Unexpected error: {e}") from e
 
+    with open(vtt_path, "w") as vtt:
+        vtt.write(
+            sprite_vtt(
+                os.path.basename(sprite_path),
+                duration,
+                frames,
+                columns,
+                tile_width,
+                tile_height,
+            )
+        )
+
+    return thumbnail_path, sprite_path, vtt_path
+
+
+def sprite_vtt(sprite_name, duration, frames, columns, tile_width, tile_height):
+    """
+    Builds the WebVTT index of a preview sprite.
+
+    Each cue covers `duration / frames` seconds and points at its tile with a
+    `#xywh=` media fragment, which is what scrub-bar preview players expect.
+
+    Args:
+    - sprite_name (str): The sprite URL, relative to the WebVTT file.
+    - duration (float): The duration of the video in seconds.
+    - frames (int): The number of tiles in the sprite.
+    - columns (int): The number of tiles per sprite row.
+    - tile_width (int): The width of one tile.
+    - tile_height (int): The height of one tile.
+
+    Returns:
+    - str: The content of the WebVTT file.
+    """
+    step = duration / frames
+    lines = ["WEBVTT", ""]
+    for index in range(frames):
+        x = (index % columns) * tile_width
+        y = (index // columns) * tile_height
+        lines.append(
+            f"{vtt_timestamp(index * step)} --> {vtt_timestamp((index + 1) * step)}"
+        )
+        lines.append(f"{sprite_name}#xywh={x},{y},{tile_width},{tile_height}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def vtt_timestamp(seconds):
+    """
+    Formats a number of seconds as a WebVTT timestamp (`HH:MM:SS.mmm`).
+    """
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+
+
+def generate_thumbnail(movie_id):
+    """
+    Creates the thumbnail and preview sprite of a movie and records them on the movie.
+
+    Runs as an RQ job so uploads do not wait for FFmpeg. The movie is updated with a
+    queryset update, which does not fire `post_save` again. `thumbnail_state` tells
+    clients whether the thumbnail is still pending, ready or failed.
+
+    Args:
+    - movie_id (int): The primary key of the movie.
+
+    Returns:
+    - str: The path to the generated thumbnail image.
+    """
+    movie = Movie.objects.get(pk=movie_id)
+    try:
+        source_path = movie.video_file.path
+        thumbnail_path, sprite_path, vtt_path = create_previews(
+            source_path, probe_video(source_path)["duration"]
+        )
+    except RuntimeError:
+        update_shared_movies(movie, thumbnail_state="failed")
+        raise
+
+    update_shared_movies(
+        movie,
+        thumbnail_file=os.path.relpath(thumbnail_path, settings.MEDIA_ROOT),
+        preview_sprite_file=os.path.relpath(sprite_path, settings.MEDIA_ROOT),
+        preview_vtt_file=os.path.relpath(vtt_path, settings.MEDIA_ROOT),
+        thumbnail_state="ready",
+    )
     return thumbnail_path
 
 
-def convert_720p(source_path):
+def probe_video(source_path):
     """
-    Converts a video file to 720p resolution.
+    Reads the stream properties of a video file with ffprobe.
+
+    Args:
+    - source_path (str): The path to the video file.
+
+    Returns:
+    - dict: The `codec`, `pix_fmt`, `width`, `height`, `bitrate` (bits per second) and
+      `duration` (in seconds) of the first video stream.
+    """
+    cmd = [
+        FFPROBE_PATH,
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries",
+        "stream=codec_name,pix_fmt,width,height,bit_rate:format=duration,bit_rate",
+        "-of", "json",
+        source_path,
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"FFprobe error: {e.stderr}") from e
+
+    data = json.loads(result.stdout)
+    stream = (data.get("streams") or [{}])[0]
+    container = data.get("format", {})
+    return {
+        "codec": stream.get("codec_name") or "",
+        "pix_fmt": stream.get("pix_fmt") or "",
+        "width": int(stream.get("width") or 0),
+        "height": int(stream.get("height") or 0),
+        # Containers often leave the stream bitrate out; the overall one is close enough.
+        "bitrate": int(stream.get("bit_rate") or container.get("bit_rate") or 0),
+        "duration": float(container.get("duration") or 0),
+    }
+
+
+def store_probe(movie, probe):
+    """
+    Saves the probed source properties on every movie sharing `movie`'s source.
+
+    Args:
+    - movie (Movie): The movie whose source was probed.
+    - probe (dict): The result of `probe_video` for the movie's source.
+    """
+    update_shared_movies(
+        movie,
+        source_codec=probe["codec"],
+        source_width=probe["width"],
+        source_height=probe["height"],
+        source_bitrate=probe["bitrate"] or None,
+        duration=probe["duration"],
+    )
+
+
+def rendition_ladder(source_height):
+    """
+    Selects the renditions worth producing for a source of the given height.
+
+    Renditions taller than the source are skipped so nothing gets upscaled. A source
+    smaller than the lowest rung still gets that rung, encoded at its native height
+    rounded down to an even number, as 4:2:0 video needs even dimensions.
+
+    Args:
+    - source_height (int): The height of the source video in pixels.
+
+    Returns:
+    - list: `(resolution, height)` tuples, lowest first.
+    """
+    ladder = [(name, height) for name, height in RENDITIONS if height <= source_height]
+    if not ladder:
+        name, _ = RENDITIONS[0]
+        ladder = [(name, source_height - source_height % 2)]
+    return ladder
 
-    This function converts the given video file to 720p resolution using FFmpeg.
+
+def probe_keyframes(source_path, seconds=KEYFRAME_PROBE_SECONDS):
+    """
+    Reads the timestamps of the video keyframes in the first `seconds` of a file.
+
+    Only packet headers are read, nothing is decoded.
+
+    Args:
+    - source_path (str): The path to the video file.
+    - seconds (float): How much of the file to read.
+
+    Returns:
+    - list: The keyframe timestamps in seconds, in file order.
+    """
+    cmd = [
+        FFPROBE_PATH,
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-read_intervals", f"%+{seconds}",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=print_section=0",
+        source_path,
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"FFprobe error: {e.stderr}") from e
+
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return keyframes
+
+
+def keyframes_aligned(keyframes, duration, seconds=KEYFRAME_PROBE_SECONDS):
+    """
+    Tells whether a keyframe starts every HLS segment in the probed part of a source.
+
+    The renditions get a keyframe at every multiple of `HLS_SEGMENT_SECONDS`. A
+    stream-copied rendition keeps the source's keyframes, so its segments only line
+    up with the other renditions' when the source has keyframes at the same times.
+
+    Args:
+    - keyframes (list): Keyframe timestamps as returned by `probe_keyframes`.
+    - duration (float): The duration of the source in seconds.
+    - seconds (float): How much of the source `keyframes` covers.
+
+    Returns:
+    - bool: True when every segment boundary has a keyframe.
+    """
+    if not keyframes:
+        return False
+    keyframes = sorted(keyframes)
+    start = keyframes[0]
+    offsets = [keyframe - start for keyframe in keyframes]
+    boundary = 0
+    while boundary < min(seconds, duration):
+        if not any(
+            # Timestamps are rounded, so 5.9999 still counts as 6.
+            boundary - 0.001 <= offset < boundary + KEYFRAME_TOLERANCE
+            for offset in offsets
+        ):
+            return False
+        boundary += HLS_SEGMENT_SECONDS
+    return True
+
+
+def remux_resolutions(source, ladder, keyframes=()):
+    """
+    Finds the rungs of the ladder the source already satisfies.
+
+    A rung is satisfied when the source is H.264 in 4:2:0 with a keyframe at every
+    HLS segment boundary, exactly as tall as the rung and within the rung's bitrate
+    budget. Those renditions are stream-copied instead of being re-encoded.
+
+    Args:
+    - source (dict): The result of `probe_video` for the source.
+    - ladder (list): `(resolution, height)` tuples as returned by `rendition_ladder`.
+    - keyframes (list): The result of `probe_keyframes` for the source; without it
+      nothing is remuxed.
+
+    Returns:
+    - set: The resolutions to remux.
+    """
+    if source["codec"] != "h264" or source["pix_fmt"] not in ("yuv420p", "yuvj420p"):
+        return set()
+    if not keyframes_aligned(keyframes, source["duration"]):
+        return set()
+    return {
+        resolution
+        for resolution, height in ladder
+        if source["height"] == height
+        and 0 < source["bitrate"] <= RENDITION_MAX_BITRATES.get(resolution, 0)
+    }
+
+
+def build_transcode_command(
+    source_path,
+    ladder,
+    output_paths=None,
+    audio=True,
+    remux=(),
+    preset=None,
+    threads=None,
+):
+    """
+    Builds a single FFmpeg command that writes every rendition of the ladder.
+
+    The source is decoded once and the decoded frames are fanned out with the `split`
+    filter to one scaler and encoder per rendition. Renditions listed in `remux` copy
+    the source video stream instead.
 
     Args:
     - source_path (str): The path to the source video file.
+    - ladder (list): `(resolution, height)` tuples as returned by `rendition_ladder`.
+    - output_paths (dict, optional): Output path per resolution. Defaults to the
+      `convert_path` name next to the source.
+    - audio (bool, optional): Whether to encode the audio track. Defaults to True.
+    - remux (iterable, optional): Resolutions to stream-copy, see `remux_resolutions`.
+    - preset (str, optional): The x264 preset. Defaults to `TRANSCODE_PRESET`.
+    - threads (int, optional): Encoder threads per rendition. Defaults to
+      `TRANSCODE_THREADS`.
+
+    Returns:
+    - list: The FFmpeg command as an argument list.
     """
-    print("converted 720")
+    if preset is None:
+        preset = settings.TRANSCODE_PRESET
+    if threads is None:
+        threads = settings.TRANSCODE_THREADS
+    encoded = [
+        (resolution, height) for resolution, height in ladder if resolution not in remux
+    ]
 
-    new_file_name = convert_path(source_path, "720p")
-    cmd = '{} -y -i "{}" -s hd720 -c:v libx264 -crf 23 -c:a aac -strict -2 "{}"'.format(
-        FFMPEG_PATH, source_path, new_file_name
-    )
-    subprocess.run(cmd, shell=True)
+    cmd = [FFMPEG_PATH, "-y", "-i", source_path]
+    if encoded:
+        filter_graph = "[0:v]split={}{}".format(
+            len(encoded), "".join(f"[s{index}]" for index in range(len(encoded)))
+        )
+        for index, (resolution, height) in enumerate(encoded):
+            filter_graph += f";[s{index}]scale=-2:{height}[v{resolution}]"
+        cmd += ["-filter_complex", filter_graph]
+
+    for resolution, _ in ladder:
+        if output_paths:
+            output_path = output_paths[resolution]
+        else:
+            output_path = convert_path(source_path, resolution)
+        if resolution in remux:
+            cmd += ["-map", "0:v:0", "-c:v", "copy"]
+        else:
+            cmd += [
+                "-map", f"[v{resolution}]",
+                "-c:v", "libx264",
+                "-preset", preset,
+                "-threads", str(threads),
+                "-crf", "23",
+                "-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+            ]
+        if audio:
+            cmd += ["-map", "0:a?", "-c:a", "aac"]
+        else:
+            cmd += ["-an"]
+        cmd.append(output_path)
+    return cmd
+
+
+def transcode_renditions(movie_id):
+    """
+    Converts a movie's video file to all renditions of the ladder in a single FFmpeg pass.
+
+    The outcome of every rendition (status, duration and size) is returned and, when
+    running inside an RQ worker, also stored in the job's meta under `renditions`;
+    progress is reported under `progress` while FFmpeg runs. Produced renditions are
+    recorded as `Rendition` rows so that readers never need to look at the filesystem.
+
+    Args:
+    - movie_id (int): The primary key of the movie to transcode.
+
+    Returns:
+    - list: One dictionary per rendition with `resolution`, `path`, `status`,
+      `duration` (in seconds) and `size` (in bytes).
+    """
+    movie = Movie.objects.get(pk=movie_id)
+    mark_processing(movie)
+    source_path = movie.video_file.path
+    try:
+        source = probe_video(source_path)
+    except RuntimeError:
+        update_shared_movies(movie, processing_state="failed")
+        raise
+    store_probe(movie, source)
+    ladder = rendition_ladder(source["height"])
+
+    remux = remux_resolutions(source, ladder, probe_keyframes(source_path))
+    cmd = build_transcode_command(source_path, ladder, remux=remux)
+    try:
+        run_ffmpeg(cmd, source["duration"])
+        error = None
+    except subprocess.CalledProcessError as e:
+        error = e.stderr
+
+    return record_renditions(movie, source_path, ladder, error)
 
 
-def convert_1080p(source_path):
-    print("converted 1080")
+def run_ffmpeg(cmd, duration=None):
+    """
+    Runs an FFmpeg command and reports its progress in the current RQ job's meta.
+
+    FFmpeg writes machine-readable progress to stdout (`-progress pipe:1`); every
+    `PROGRESS_INTERVAL` seconds the parsed values are saved under `progress` in the
+    job meta. Stderr goes to a temporary file so a chatty encode cannot block.
 
-    new_file_name = convert_path(source_path, "1080p")
-    cmd = (
-        '{} -y -i "{}" -s hd1080 -c:v libx264 -crf 23 -c:a aac -strict -2 "{}"'.format(
-            FFMPEG_PATH, source_path, new_file_name
+    Args:
+    - cmd (list): The FFmpeg command as an argument list.
+    - duration (float, optional): The duration of the input, used for percent and ETA.
+
+    Raises:
+    - subprocess.CalledProcessError: If FFmpeg exits with an error; `stderr` holds its output.
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+    job = get_current_job()
+    values = {}
+    last_report = 0
+    with tempfile.TemporaryFile(mode="w+") as stderr:
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=stderr, text=True
         )
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            values[key] = value
+            if key != "progress" or job is None:
+                continue
+            now = time.monotonic()
+            if value == "end" or now - last_report >= PROGRESS_INTERVAL:
+                job.meta["progress"] = parse_progress(values, duration)
+                job.save_meta()
+                last_report = now
+
+        returncode = process.wait()
+        if returncode != 0:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr.read())
+
+
+def parse_progress(values, duration=None):
+    """
+    Turns one block of FFmpeg `-progress` output into progress figures.
+
+    Args:
+    - values (dict): The `key=value` pairs of the latest progress block.
+    - duration (float, optional): The duration of the input in seconds.
+
+    Returns:
+    - dict: `out_time` (seconds encoded), `fps`, `speed` (x realtime), and, when the
+      duration is known, `percent` and `eta` (seconds left).
+    """
+    out_time = to_float(values.get("out_time_us") or values.get("out_time_ms")) / 1e6
+    speed = to_float(values.get("speed", "").rstrip("x"))
+    progress = {
+        "out_time": round(out_time, 2),
+        "fps": to_float(values.get("fps")),
+        "speed": speed,
+        "percent": None,
+        "eta": None,
+    }
+    if duration:
+        progress["percent"] = round(min(100.0, out_time / duration * 100), 1)
+        if speed > 0:
+            progress["eta"] = round(max(0.0, duration - out_time) / speed)
+    if values.get("progress") == "end":
+        progress["percent"] = 100.0
+        progress["eta"] = 0
+    return progress
+
+
+def combine_progress(parts):
+    """
+    Sums up the progress of the segment jobs of a movie encoded in segments.
+
+    Args:
+    - parts (list): The `progress` meta of every segment job, None for jobs that
+      have not started yet.
+
+    Returns:
+    - dict: `percent` over all segments, `segments` and `segments_done`.
+    """
+    percents = [(part or {}).get("percent") or 0.0 for part in parts]
+    return {
+        "percent": round(sum(percents) / len(percents), 1) if percents else None,
+        "segments": len(percents),
+        "segments_done": sum(1 for percent in percents if percent >= 100),
+    }
+
+
+def to_float(value):
+    """
+    Converts an FFmpeg progress value to a float, treating `N/A` and blanks as 0.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def mark_processing(movie):
+    """
+    Flags a movie (and movies sharing its source) as being processed by the current job.
+    """
+    job = get_current_job()
+    update_shared_movies(
+        movie,
+        processing_state="processing",
+        processing_job_id=job.id if job is not None else "",
     )
-    subprocess.run(cmd, shell=True)
 
 
-def convert_480p(source_path):
+def record_thumbnail_failure(job, connection, type, value, traceback):
+    """
+    RQ failure callback marking the thumbnail of a movie as failed.
+
+    `generate_thumbnail` records FFmpeg errors itself; this also covers timeouts and
+    anything else that ends the job.
+
+    Args:
+    - job (Job): The failed job; its first argument is the movie's primary key.
+    """
+    movie = Movie.objects.filter(pk=job.args[0]).first()
+    if movie is not None:
+        update_shared_movies(movie, thumbnail_state="failed")
+
+
+def record_processing_failure(job, connection, type, value, traceback):
     """
-    Converts a video file to 480p resolution.
+    RQ failure callback marking the movie of a processing job as failed.
 
-    This function converts the given video file to 480p resolution using FFmpeg.
+    A job with retries left is skipped until its last attempt fails. Jobs depending
+    on a failed job are never run, so without this a movie whose segment encode or
+    packaging gave up (or timed out) would stay `processing` forever.
+
+    Args:
+    - job (Job): The failed job; its first argument is the movie's primary key.
+    """
+    if job.retries_left:
+        return
+    movie = Movie.objects.filter(pk=job.args[0]).first()
+    if movie is not None:
+        update_shared_movies(movie, processing_state="failed")
+
+
+def record_renditions(movie, source_path, ladder, error):
+    """
+    Records the outcome of a transcode on the movie, its `Rendition` rows and the RQ job.
+
+    Args:
+    - movie (Movie): The movie that was transcoded.
+    - source_path (str): The path to the source video file.
+    - ladder (list): The `(resolution, height)` tuples that were requested.
+    - error (str): FFmpeg's error output, or None if it succeeded.
+
+    Returns:
+    - list: One result dictionary per rendition, see `transcode_renditions`.
+
+    Raises:
+    - RuntimeError: If FFmpeg failed, after the failure has been recorded.
+    """
+    produced = {resolution for resolution, _ in ladder}
+    results = []
+    for resolution, _ in RENDITIONS:
+        path = convert_path(source_path, resolution)
+        result = {
+            "resolution": resolution,
+            "path": path,
+            "status": "skipped",
+            "duration": None,
+            "size": None,
+        }
+        if resolution in produced:
+            if error is None and os.path.isfile(path):
+                result["status"] = "ready"
+                result["duration"] = probe_video(path)["duration"]
+                result["size"] = os.path.getsize(path)
+            else:
+                result["status"] = "failed"
+            save_rendition(movie, result)
+        results.append(result)
+    if error is not None:
+        update_shared_movies(movie, processing_state="failed")
+    else:
+        update_shared_movies(movie)
+
+    job = get_current_job()
+    if job is not None:
+        job.meta["renditions"] = results
+        job.save_meta()
+
+    if error is not None:
+        raise RuntimeError(f"FFmpeg error: {error}")
+    return results
+
+
+def split_source(source_path, segment_seconds):
+    """
+    Cuts the video stream of a source into segments for parallel transcoding.
+
+    The stream is copied, not re-encoded, so the cuts fall on the source's keyframes
+    and every segment can be decoded on its own. Segments are written as Matroska,
+    which holds any codec an upload may use (VP8, MPEG-2, WMV, ...), unlike MP4.
 
     Args:
     - source_path (str): The path to the source video file.
+    - segment_seconds (int): The target length of a segment.
+
+    Returns:
+    - list: The paths of the segments, in playback order.
+    """
+    output_dir = segment_dir(source_path)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+
+    cmd = [
+        FFMPEG_PATH,
+        "-y",
+        "-i", source_path,
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_time", str(segment_seconds),
+        "-reset_timestamps", "1",
+        os.path.join(output_dir, "source_%05d.mkv"),
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"FFmpeg error: {e.stderr}") from e
+
+    return sorted(
+        os.path.join(output_dir, name)
+        for name in os.listdir(output_dir)
+        if name.startswith("source_")
+    )
+
+
+def segment_output_path(segment_path, resolution):
+    """
+    Returns where the given rendition of a source segment is written.
+    """
+    directory, name = os.path.split(segment_path)
+    return os.path.join(directory, name.replace("source_", f"{resolution}_", 1))
+
+
+def transcode_segment(movie_id, segment_path, ladder, remux=(), duration=None):
+    """
+    Encodes one source segment to every rendition of the ladder.
+
+    Runs as its own RQ job so the segments of a long movie are spread over all
+    workers; a failed segment is retried without touching the others. Audio is left
+    out here and encoded once when the segments are joined.
+
+    Args:
+    - movie_id (int): The primary key of the movie (for logging in the RQ dashboard).
+    - segment_path (str): The path to the source segment.
+    - ladder (list): The `(resolution, height)` tuples to produce.
+    - remux (iterable, optional): Resolutions to stream-copy, see `remux_resolutions`.
+    - duration (float, optional): The length of the segment, used for progress.
+
+    Returns:
+    - list: The paths of the encoded segment renditions.
+    """
+    output_paths = {
+        resolution: segment_output_path(segment_path, resolution)
+        for resolution, _ in ladder
+    }
+    cmd = build_transcode_command(
+        segment_path, ladder, output_paths, audio=False, remux=remux
+    )
+    try:
+        run_ffmpeg(cmd, duration)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"FFmpeg error: {e.stderr}") from e
+    return list(output_paths.values())
+
+
+def concat_segments(movie_id, ladder, segment_paths):
+    """
+    Joins the encoded segments into the final renditions of a movie.
+
+    Runs once every `transcode_segment` job has finished. The video segments are
+    concatenated without re-encoding and the audio of the source is encoded once
+    and muxed in. The outcome is recorded like a single-pass transcode, and from
+    here on the movie's progress is read from this job.
+
+    Args:
+    - movie_id (int): The primary key of the movie.
+    - ladder (list): The `(resolution, height)` tuples that were produced.
+    - segment_paths (list): The source segments, in playback order.
+
+    Returns:
+    - list: One result dictionary per rendition, see `transcode_renditions`.
+    """
+    movie = Movie.objects.get(pk=movie_id)
+    mark_processing(movie)
+    source_path = movie.video_file.path
+    output_dir = segment_dir(source_path)
+
+    error = None
+    for resolution, _ in ladder:
+        list_path = os.path.join(output_dir, f"{resolution}.txt")
+        with open(list_path, "w") as concat_list:
+            for segment_path in segment_paths:
+                concat_list.write(
+                    "file '{}'\n".format(segment_output_path(segment_path, resolution))
+                )
+
+        cmd = [
+            FFMPEG_PATH,
+            "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", list_path,
+            "-i", source_path,
+            "-map", "0:v",
+            "-map", "1:a?",
+            "-c:v", "copy",
+            "-c:a", "aac",
+            convert_path(source_path, resolution),
+        ]
+        try:
+            run_ffmpeg(cmd, movie.duration)
+        except subprocess.CalledProcessError as e:
+            error = e.stderr
+            break
+
+    if error is None:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return record_renditions(movie, source_path, ladder, error)
+
+
+def save_rendition(movie, result):
+    """
+    Creates or updates the `Rendition` rows described by a transcode result.
+
+    The rendition is recorded for every movie sharing the source file of `movie`.
+
+    Args:
+    - movie (Movie): The movie the rendition was produced for.
+    - result (dict): A rendition result as produced by `transcode_renditions`.
+    """
+    ready = result["status"] == "ready"
+    bitrate = None
+    if ready and result["duration"]:
+        bitrate = int(result["size"] * 8 / result["duration"])
+
+    for movie_id in shared_movies(movie).values_list("pk", flat=True):
+        Rendition.objects.update_or_create(
+            movie_id=movie_id,
+            resolution=result["resolution"],
+            defaults={
+                "path": os.path.relpath(result["path"], settings.MEDIA_ROOT),
+                "bytes": result["size"],
+                "bitrate": bitrate,
+                "ready": ready,
+            },
+        )
+
+
+def shared_movies(movie):
+    """
+    Returns the movies whose media is produced together with `movie`'s.
+
+    Movies uploaded with identical content share one `MediaBlob` and therefore one
+    set of renditions and thumbnails; older movies without a blob stand alone.
+
+    Args:
+    - movie (Movie): The movie a task is processing.
+
+    Returns:
+    - QuerySet: The movies sharing the source file, including `movie` itself.
+    """
+    if movie.blob_id:
+        return Movie.objects.filter(blob_id=movie.blob_id)
+    return Movie.objects.filter(pk=movie.pk)
+
+
+def update_shared_movies(movie, **fields):
+    """
+    Updates every movie sharing `movie`'s source and invalidates their cached listings.
+
+    A queryset update is used so `post_save` does not fire again; `updated_at` is
+    set explicitly because `auto_now` only applies to `save()`.
+
+    Args:
+    - movie (Movie): The movie a task is processing.
+    - **fields: The field values to store.
+    """
+    movies = shared_movies(movie)
+    movies.update(updated_at=timezone.now(), **fields)
+    for user_id, access in movies.values_list("user_id", "access"):
+        invalidate_movie(user_id, access)
+
+
+def share_processed_media(source, target):
+    """
+    Gives `target` the renditions, stream manifest and previews of `source`.
+
+    Used when an upload turns out to be identical to an existing movie, instead of
+    transcoding it again. Media still being produced for `source` reaches `target`
+    as well, since the tasks update all movies sharing the source file.
+
+    Args:
+    - source (Movie): A movie with the same `MediaBlob`.
+    - target (Movie): The newly uploaded movie.
+    """
+    Rendition.objects.bulk_create(
+        [
+            Rendition(
+                movie_id=target.pk,
+                resolution=rendition.resolution,
+                path=rendition.path,
+                bytes=rendition.bytes,
+                bitrate=rendition.bitrate,
+                ready=rendition.ready,
+            )
+            for rendition in source.renditions.all()
+        ],
+        ignore_conflicts=True,
+    )
+    Movie.objects.filter(pk=target.pk).update(
+        stream_manifest=source.stream_manifest,
+        thumbnail_file=source.thumbnail_file.name,
+        preview_sprite_file=source.preview_sprite_file.name,
+        preview_vtt_file=source.preview_vtt_file.name,
+        thumbnail_state=source.thumbnail_state,
+        processing_state=source.processing_state,
+        processing_job_id=source.processing_job_id,
+        updated_at=timezone.now(),
+    )
+    invalidate_movie(target.user_id, target.access)
+
+
+def package_hls(movie_id):
+    """
+    Cuts the transcoded renditions of a movie into HLS segments and writes a master playlist.
+
+    Every ready rendition is remuxed (no re-encoding) into `HLS_SEGMENT_SECONDS` long
+    MPEG-TS segments with its own media playlist. The master playlist lists them as
+    variants so players can switch bitrate between segments, and its location is
+    stored in `Movie.stream_manifest`. This is the last processing step, so the
+    movie's `processing_state` becomes `ready` here.
+
+    Args:
+    - movie_id (int): The primary key of the movie to package.
+
+    Returns:
+    - str: The path to the master playlist, or None if no rendition is ready.
     """
+    movie = Movie.objects.get(pk=movie_id)
+    output_dir = hls_dir(movie.video_file.path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    variants = []
+    for rendition in movie.renditions.filter(ready=True):
+        rendition_path = os.path.join(settings.MEDIA_ROOT, rendition.path)
+        cmd = [
+            FFMPEG_PATH,
+            "-y",
+            "-i", rendition_path,
+            "-c", "copy",
+            "-f", "hls",
+            "-hls_time", str(HLS_SEGMENT_SECONDS),
+            "-hls_playlist_type", "vod",
+            "-hls_segment_filename",
+            os.path.join(output_dir, f"{rendition.resolution}_%05d.ts"),
+            os.path.join(output_dir, f"{rendition.resolution}.m3u8"),
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            update_shared_movies(movie, processing_state="failed")
+            raise RuntimeError(f"FFmpeg error: {e.stderr}") from e
+
+        source = probe_video(rendition_path)
+        bandwidth = variant_bandwidth(
+            rendition.bitrate,
+            os.path.getsize(rendition_path),
+            source["duration"],
+            movie.source_bitrate,
+        )
+        if bandwidth is None:
+            # A variant without BANDWIDTH makes players reject the whole playlist.
+            continue
+        variants.append(
+            (rendition.resolution, bandwidth, source["width"], source["height"])
+        )
+
+    if not variants:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        update_shared_movies(movie, processing_state="failed")
+        return None
+
+    variants.sort(key=lambda variant: variant[3])
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for resolution, bandwidth, width, height in variants:
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height}")
+        lines.append(f"{resolution}.m3u8")
 
-    new_file_name = convert_path(source_path, "480p")
-    cmd = '{} -y -i "{}" -s hd480 -c:v libx264 -crf 23 -c:a aac -strict -2 "{}"'.format(
-        FFMPEG_PATH, source_path, new_file_name
+    manifest_path = os.path.join(output_dir, "master.m3u8")
+    with open(manifest_path, "w") as manifest:
+        manifest.write("\n".join(lines) + "\n")
+
+    update_shared_movies(
+        movie,
+        stream_manifest=os.path.relpath(manifest_path, settings.MEDIA_ROOT),
+        processing_state="ready",
     )
-    print("converted480")
-    subprocess.run(cmd, shell=True)
+    return manifest_path
+
+
+def variant_bandwidth(bitrate, size, duration, source_bitrate):
+    """
+    Picks the `BANDWIDTH` of an HLS variant.
+
+    The recorded rendition bitrate is missing when its duration could not be read
+    at transcode time; the size and the duration probed for packaging are used
+    then, and the source bitrate as a last resort.
+
+    Args:
+    - bitrate (int): The bitrate stored on the `Rendition`, or None.
+    - size (int): The size of the rendition file in bytes.
+    - duration (float): The duration of the rendition in seconds.
+    - source_bitrate (int): The probed bitrate of the source, or None.
+
+    Returns:
+    - int: The bandwidth in bits per second, or None if none is known.
+    """
+    if bitrate:
+        return bitrate
+    if duration:
+        return int(size * 8 / duration)
+    return source_bitrate or None
+
+
+def media_paths(movie):
+    """
+    Lists every file and directory holding media of a movie.
+
+    Args:
+    - movie (Movie): The movie, which may already be deleted from the database.
+
+    Returns:
+    - list: Absolute paths of the source, the previews, all renditions and the HLS and
+      segment directories. Paths that do not exist are included too.
+    """
+    paths = [
+        preview_file.path
+        for preview_file in (
+            movie.thumbnail_file,
+            movie.preview_sprite_file,
+            movie.preview_vtt_file,
+        )
+        if preview_file
+    ]
+    if movie.video_file:
+        source_path = movie.video_file.path
+        paths.append(source_path)
+        paths += [convert_path(source_path, resolution) for resolution, _ in RENDITIONS]
+        paths += [hls_dir(source_path), segment_dir(source_path)]
+    return paths
+
+
+def remove_media(paths):
+    """
+    Removes media files and directories left behind by deleted movies.
+
+    Called from the `remove_pending_media` job, so removing a user with many movies
+    does not touch the filesystem inside the request. Missing paths are skipped.
+
+    Args:
+    - paths (list): Absolute paths of files and directories to remove.
+
+    Returns:
+    - int: The number of paths that were removed.
+    """
+    removed = 0
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.isfile(path):
+            os.remove(path)
+        else:
+            continue
+        removed += 1
+    return removed
+
+
+def hls_dir(source_path):
+    """
+    Returns the directory holding the HLS playlists and segments of a video.
+
+    Args:
+    - source_path (str): The path to the source video file.
+
+    Returns:
+    - str: The path of the `<name>_hls` directory next to the source file.
+    """
+    return f"{os.path.splitext(source_path)[0]}_hls"
+
+
+def segment_dir(source_path):
+    """
+    Returns the working directory for the segments of a parallel transcode.
+
+    It lives under `MEDIA_ROOT` so workers on other hosts sharing the media volume
+    can read and write the segments.
+
+    Args:
+    - source_path (str): The path to the source video file.
+
+    Returns:
+    - str: The path of the `<name>_segments` directory next to the source file.
+    """
+    return f"{os.path.splitext(source_path)[0]}_segments"
 
 
 def convert_path(source_path, resolution):
@@ -1,11 +1,39 @@
 import os
 import subprocess
+import tempfile
+import django_rq
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 from user.models import CustomUser
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from datetime import date, timedelta
+from django.conf import settings
+from types import SimpleNamespace
+from unittest import mock
+from movies.media import parse_range
+from movies.models import Movie, UploadSession
+from movies.scheduling import CLEANUP_KEY, remove_pending_media, schedule_media_cleanup
+from movies.search import prefix_tsquery, search_movies
+from movies.signing import media_scope, signed_media_url, verify_media_signature
+from movies.pagination import decode_cursor, encode_cursor
+from movies.storage import blob_digest
+from movies.uploads import commit_upload, remove_upload_sessions, stale_upload_sessions
+from movies.tasks import (
+    build_transcode_command,
+    combine_progress,
+    keyframes_aligned,
+    parse_progress,
+    record_processing_failure,
+    remux_resolutions,
+    rendition_ladder,
+    segment_output_path,
+    variant_bandwidth,
+    sprite_vtt,
+)
 
 class MovieTests(TestCase):
     def setUp(self):
@@ -67,3 +95,610 @@ class MovieTests(TestCase):
         video_path = os.path.join(os.path.dirname(__file__), 'test_video.mp4')
         if os.path.exists(video_path):
             os.remove(video_path)
+
+
+class RenditionLadderTests(TestCase):
+    def test_skips_renditions_taller_than_source(self):
+        ladder = rendition_ladder(720)
+        self.assertEqual(ladder, [("480p", 480), ("720p", 720)])
+
+    def test_small_source_keeps_native_height(self):
+        self.assertEqual(rendition_ladder(360), [("480p", 360)])
+
+    def test_odd_source_height_is_rounded_down_to_even(self):
+        self.assertEqual(rendition_ladder(359), [("480p", 358)])
+
+    def test_single_decode_for_all_renditions(self):
+        cmd = build_transcode_command("/media/videos/clip.mp4", rendition_ladder(1080))
+        self.assertEqual(cmd.count("-i"), 1)
+        self.assertIn("split=3", cmd[cmd.index("-filter_complex") + 1])
+        self.assertIn("/media/videos/clip_1080p.mp4", cmd)
+
+    def test_preset_and_threads_are_applied_per_rendition(self):
+        cmd = build_transcode_command(
+            "/media/videos/clip.mp4", rendition_ladder(720), preset="veryfast", threads=2
+        )
+        self.assertEqual(cmd.count("veryfast"), 2)
+        self.assertEqual(cmd[cmd.index("-threads") + 1], "2")
+
+    source = {
+        "codec": "h264",
+        "pix_fmt": "yuv420p",
+        "height": 720,
+        "bitrate": 3_000_000,
+        "duration": 30,
+    }
+
+    def test_compliant_rung_is_remuxed(self):
+        ladder = rendition_ladder(720)
+        remux = remux_resolutions(self.source, ladder, [0, 2, 4, 6, 8, 10, 12, 18, 24])
+        self.assertEqual(remux, {"720p"})
+
+        cmd = build_transcode_command("/media/videos/clip.mp4", ladder, remux=remux)
+        self.assertIn("split=1", cmd[cmd.index("-filter_complex") + 1])
+        self.assertIn("copy", cmd)
+
+    def test_other_codecs_are_reencoded(self):
+        source = {**self.source, "codec": "hevc"}
+        keyframes = [0, 6, 12, 18, 24]
+        self.assertEqual(remux_resolutions(source, rendition_ladder(720), keyframes), set())
+
+    def test_unaligned_keyframes_are_reencoded(self):
+        ladder = rendition_ladder(720)
+        self.assertEqual(remux_resolutions(self.source, ladder, [0, 10, 20]), set())
+        self.assertEqual(remux_resolutions(self.source, ladder), set())
+
+    def test_keyframe_alignment_ignores_the_start_offset(self):
+        self.assertTrue(keyframes_aligned([1.4, 7.4, 13.4, 19.45], 20))
+        self.assertFalse(keyframes_aligned([0, 6, 12], 20))
+
+    def test_variant_bandwidth_falls_back_to_size_and_source(self):
+        self.assertEqual(variant_bandwidth(2_000_000, 0, 0, None), 2_000_000)
+        self.assertEqual(variant_bandwidth(None, 1_000_000, 8.0, None), 1_000_000)
+        self.assertEqual(variant_bandwidth(None, 1_000_000, 0, 3_000_000), 3_000_000)
+        self.assertIsNone(variant_bandwidth(None, 1_000_000, 0, None))
+
+    def test_segment_renditions_are_written_next_to_the_segment(self):
+        self.assertEqual(
+            segment_output_path("/media/videos/clip_segments/source_00003.mkv", "720p"),
+            "/media/videos/clip_segments/720p_00003.mkv",
+        )
+
+
+class PreviewSpriteTests(TestCase):
+    def test_vtt_points_each_cue_at_its_tile(self):
+        vtt = sprite_vtt("clip_sprite.jpg", 20, 4, 2, 160, 90)
+        self.assertTrue(vtt.startswith("WEBVTT"))
+        self.assertIn("00:00:00.000 --> 00:00:05.000\nclip_sprite.jpg#xywh=0,0,160,90", vtt)
+        self.assertIn("00:00:15.000 --> 00:00:20.000\nclip_sprite.jpg#xywh=160,90,160,90", vtt)
+
+
+class CursorTests(TestCase):
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(date(2024, 8, 2), 42)
+        self.assertEqual(decode_cursor(cursor), (date(2024, 8, 2), 42))
+
+
+class BlobDigestTests(TestCase):
+    def test_digest_from_content_addressed_name(self):
+        digest = "a" * 64
+        self.assertEqual(blob_digest(f"videos/{digest}.mp4"), digest)
+
+    def test_legacy_names_have_no_digest(self):
+        self.assertIsNone(blob_digest("videos/holiday_clip.mp4"))
+
+
+class ProgressTests(TestCase):
+    def test_percent_and_eta_from_progress_block(self):
+        progress = parse_progress(
+            {"out_time_us": "30000000", "fps": "48.0", "speed": "2.0x", "progress": "continue"},
+            duration=120,
+        )
+        self.assertEqual(progress["percent"], 25.0)
+        self.assertEqual(progress["eta"], 45)
+        self.assertEqual(progress["fps"], 48.0)
+
+    def test_unknown_values_do_not_fail(self):
+        progress = parse_progress({"out_time_us": "N/A", "speed": "N/A", "progress": "continue"})
+        self.assertEqual(progress["out_time"], 0)
+        self.assertIsNone(progress["percent"])
+
+    def test_segment_progress_is_combined(self):
+        progress = combine_progress([{"percent": 100.0}, {"percent": 50.0}, None])
+        self.assertEqual(progress["percent"], 50.0)
+        self.assertEqual(progress["segments"], 3)
+        self.assertEqual(progress["segments_done"], 1)
+
+
+class ByteRangeTests(TestCase):
+    def test_open_and_bounded_ranges(self):
+        self.assertEqual(parse_range("bytes=100-", 1000), (100, 999))
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-5000", 1000), (900, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range("bytes=-200", 1000), (800, 999))
+
+    def test_unsatisfiable_ranges(self):
+        self.assertIsNone(parse_range("bytes=1000-", 1000))
+        self.assertIsNone(parse_range("bytes=0-1,5-9", 1000))
+        self.assertIsNone(parse_range("bytes=-", 1000))
+
+
+class SignedUrlTests(TestCase):
+    def test_derived_files_share_the_source_scope(self):
+        self.assertEqual(media_scope("videos/abc_hls/720p/segment_00001.ts"), "videos/abc")
+        self.assertEqual(media_scope("videos/abc_1080p.mp4"), "videos/abc")
+        self.assertEqual(media_scope("thumbnails/abc_sprite.vtt"), "thumbnails/abc")
+        self.assertIsNone(media_scope("uploads/abc.part"))
+
+    def test_signature_covers_the_hls_directory(self):
+        url = signed_media_url("videos/abc_hls/master.m3u8", expires=2_000_000_000)
+        expires, signature = url.split("/")[3:5]
+        self.assertTrue(
+            verify_media_signature(
+                "videos/abc_hls/480p/segment_00000.ts", int(expires), signature, now=0
+            )
+        )
+        self.assertFalse(
+            verify_media_signature("videos/other_hls/master.m3u8", int(expires), signature, now=0)
+        )
+
+    def test_expired_signature_is_rejected(self):
+        url = signed_media_url("videos/abc.mp4", expires=100)
+        signature = url.split("/")[4]
+        self.assertFalse(verify_media_signature("videos/abc.mp4", 100, signature, now=200))
+
+
+class SearchQueryTests(TestCase):
+    def test_words_become_prefix_terms(self):
+        self.assertEqual(prefix_tsquery("Star Wa"), "star:* & wa:*")
+
+    def test_tsquery_operators_are_dropped(self):
+        self.assertEqual(prefix_tsquery("cats & !dogs:*"), "cats:* & dogs:*")
+        self.assertEqual(prefix_tsquery(" &|! "), "")
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = CustomUser.objects.create_user(email="owner@test.com", password="pw")
+        Movie.objects.bulk_create(
+            [
+                Movie(
+                    title=f"Happiness {number}",
+                    description="A walk in the park",
+                    video_file=f"videos/happy{number}.mp4",
+                    user=self.owner,
+                    access="public",
+                )
+                for number in range(3)
+            ]
+            + [
+                Movie(
+                    title="Happiness at home",
+                    description="Private",
+                    video_file="videos/home.mp4",
+                    user=self.owner,
+                    access="private",
+                )
+            ]
+        )
+
+    def search(self, **params):
+        return self.client.get(reverse("video_search"), params)
+
+    def test_partly_typed_word_matches_as_prefix(self):
+        titles = {movie.title for movie in search_movies(Movie.objects.all(), "happin")}
+        self.assertIn("Happiness 0", titles)
+        self.assertFalse(search_movies(Movie.objects.all(), "sadness").exists())
+
+    def test_private_movies_are_only_found_by_their_owner(self):
+        response = self.search(q="home")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+
+        self.client.force_authenticate(self.owner)
+        titles = [movie["title"] for movie in self.search(q="home").data["results"]]
+        self.assertEqual(titles, ["Happiness at home"])
+
+    @override_settings(VIDEO_MAX_PAGE_SIZE=2)
+    def test_limit_is_capped(self):
+        self.assertEqual(len(self.search(q="happ", limit=1).data["results"]), 1)
+        self.assertEqual(len(self.search(q="happ", limit=50).data["results"]), 2)
+
+    def test_empty_query_is_rejected(self):
+        self.assertEqual(self.search(q="&!").status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ListingVisibilityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = CustomUser.objects.create_user(
+            email="owner@test.com", password="testpassword"
+        )
+        # bulk_create skips post_save, so no media processing is queued.
+        Movie.objects.bulk_create(
+            [
+                Movie(
+                    title="Open",
+                    video_file="videos/open.mp4",
+                    user=self.owner,
+                    access="public",
+                ),
+                Movie(
+                    title="Secret",
+                    video_file="videos/secret.mp4",
+                    user=self.owner,
+                    access="private",
+                ),
+            ]
+        )
+        cache.clear()
+
+    def titles(self, response):
+        return {movie["title"] for movie in response.data["results"]}
+
+    def test_private_movies_are_hidden_from_other_users(self):
+        url = reverse("video_with_user", kwargs={"user_id": self.owner.pk})
+        self.assertEqual(self.titles(self.client.get(url)), {"Open"})
+
+        other = CustomUser.objects.create_user(email="other@test.com", password="pw")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.titles(self.client.get(url)), {"Open"})
+
+    def test_owner_sees_private_movies(self):
+        self.client.force_authenticate(self.owner)
+        url = reverse("video_with_user", kwargs={"user_id": self.owner.pk})
+        self.assertEqual(self.titles(self.client.get(url)), {"Open", "Secret"})
+
+    def test_own_videos_include_private_movies(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(reverse("own_videos"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(response), {"Open", "Secret"})
+
+    def test_own_videos_are_scoped_to_the_user(self):
+        other = CustomUser.objects.create_user(email="other@test.com", password="pw")
+        Movie.objects.bulk_create(
+            [Movie(title="Theirs", video_file="videos/theirs.mp4", user=other)]
+        )
+        self.client.force_authenticate(other)
+        self.assertEqual(self.titles(self.client.get(reverse("own_videos"))), {"Theirs"})
+
+    def test_own_videos_require_authentication(self):
+        self.assertEqual(self.client.get(reverse("own_videos")).status_code, 401)
+
+
+class ProcessingFailureTests(TestCase):
+    def setUp(self):
+        owner = CustomUser.objects.create_user(email="owner@test.com", password="pw")
+        (self.movie,) = Movie.objects.bulk_create(
+            [
+                Movie(
+                    title="Long",
+                    video_file="videos/long.mp4",
+                    user=owner,
+                    processing_state="processing",
+                )
+            ]
+        )
+
+    def fail(self, retries_left):
+        job = SimpleNamespace(args=[self.movie.pk], retries_left=retries_left)
+        record_processing_failure(job, None, RuntimeError, RuntimeError(), None)
+        self.movie.refresh_from_db()
+        return self.movie.processing_state
+
+    def test_job_with_retries_left_keeps_processing(self):
+        self.assertEqual(self.fail(2), "processing")
+
+    def test_final_failure_marks_movie_failed(self):
+        self.assertEqual(self.fail(0), "failed")
+        self.assertEqual(self.fail(None), "failed")
+
+
+class ThumbnailAccessTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = CustomUser.objects.create_user(email="owner@test.com", password="pw")
+        (self.movie,) = Movie.objects.bulk_create(
+            [
+                Movie(
+                    title="Secret",
+                    video_file="videos/secret.mp4",
+                    thumbnail_file="thumbnails/secret.jpg",
+                    thumbnail_state="ready",
+                    user=self.owner,
+                    access="private",
+                )
+            ]
+        )
+        self.url = reverse("video_thumbnail", kwargs={"movie_id": self.movie.pk})
+
+    def test_private_thumbnail_is_forbidden_to_others(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_owner_gets_a_signed_url(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        url = response.data["thumbnail_url"]
+        self.assertIn("/s/", url)
+        self.assertTrue(url.endswith("/thumbnails/secret.jpg"))
+
+
+class MediaFileTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE_BACKEND="")
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(media_root, "videos"))
+        self.content = bytes(range(256)) * 4
+        with open(os.path.join(media_root, "videos", "secret.mp4"), "wb") as file:
+            file.write(self.content)
+
+        self.client = APIClient()
+        self.owner = CustomUser.objects.create_user(email="owner@test.com", password="pw")
+        Movie.objects.bulk_create(
+            [
+                Movie(
+                    title="Secret",
+                    video_file="videos/secret.mp4",
+                    user=self.owner,
+                    access="private",
+                )
+            ]
+        )
+        self.url = reverse("media", kwargs={"name": "videos/secret.mp4"})
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_private_file_is_missing_for_others(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bad_signature_is_forbidden(self):
+        url = reverse(
+            "signed_media",
+            kwargs={
+                "expires": int(timezone.now().timestamp()) + 3600,
+                "signature": "0" * 32,
+                "name": "videos/secret.mp4",
+            },
+        )
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_signed_url_is_served_without_a_user(self):
+        expires = int(timezone.now().timestamp()) + 3600
+        response = self.client.get(signed_media_url("videos/secret.mp4", expires))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Cache-Control"].startswith("public"))
+
+    def test_owner_gets_the_file(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Cache-Control"], "private")
+        self.assertEqual(self.body(response), self.content)
+
+    def test_range_returns_partial_content(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Range"], "bytes 100-199/1024")
+        self.assertEqual(self.body(response), self.content[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=1000-")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(self.body(response), self.content[1000:])
+
+    def test_unsatisfiable_range(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2000-")
+        self.assertEqual(
+            response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_if_range_is_checked_against_the_etag(self):
+        self.client.force_authenticate(self.owner)
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.body(response), self.content)
+
+
+class MediaCleanupTests(TestCase):
+    def setUp(self):
+        django_rq.get_connection("default").delete(CLEANUP_KEY)
+
+    def test_media_deleted_in_one_transaction_is_removed_by_one_job(self):
+        directory = tempfile.mkdtemp()
+        paths = [os.path.join(directory, name) for name in ("a.mp4", "b.mp4")]
+        for path in paths:
+            open(path, "wb").close()
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_media_cleanup(paths[:1])
+            schedule_media_cleanup(paths[1:])
+        self.assertEqual(remove_pending_media(), 2)
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_nothing_is_queued_before_the_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            schedule_media_cleanup(["/nonexistent/a.mp4"])
+        self.assertEqual(django_rq.get_connection("default").llen(CLEANUP_KEY), 0)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class UploadTests(TestCase):
+    content = b"0123456789"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="up@test.com", password="pw")
+        self.client.force_authenticate(self.user)
+
+    def create_session(self):
+        response = self.client.post(
+            reverse("upload"), {"filename": "clip.mp4", "size": len(self.content)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return UploadSession.objects.get(pk=response.data["id"])
+
+    def send(self, session, offset, chunk):
+        return self.client.generic(
+            "PATCH",
+            reverse("upload_detail", kwargs={"upload_id": session.pk}),
+            chunk,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def file_path(self, session):
+        return os.path.join(settings.MEDIA_ROOT, session.path)
+
+    def test_create_reserves_an_empty_file(self):
+        session = self.create_session()
+        self.assertEqual(os.path.getsize(self.file_path(session)), 0)
+        self.assertEqual(session.state, "uploading")
+
+    def test_chunk_at_the_wrong_offset_is_rejected(self):
+        session = self.create_session()
+        response = self.send(session, 5, self.content[5:])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response["Upload-Offset"], "0")
+
+    def test_upload_resumes_from_the_reported_offset(self):
+        session = self.create_session()
+        response = self.send(session, 0, self.content[:4])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        url = reverse("upload_detail", kwargs={"upload_id": session.pk})
+        offset = int(self.client.head(url)["Upload-Offset"])
+        self.assertEqual(offset, 4)
+        response = self.send(session, offset, self.content[offset:])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        with open(self.file_path(session), "rb") as uploaded:
+            self.assertEqual(uploaded.read(), self.content)
+
+    def test_commit_creates_the_movie_in_a_job(self):
+        session = self.create_session()
+        commit_url = reverse("upload_commit", kwargs={"upload_id": session.pk})
+        self.assertEqual(
+            self.client.post(commit_url, {"title": "Clip"}).status_code,
+            status.HTTP_409_CONFLICT,
+        )
+        self.send(session, 0, self.content)
+
+        response = self.client.post(
+            commit_url, {"title": "Clip", "description": "Uploaded", "access": "public"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["state"], "committing")
+        response = self.send(session, len(self.content), b"x")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        movie = Movie.objects.get(pk=commit_upload(session.pk))
+        self.assertEqual(movie.access, "public")
+        self.assertIsNotNone(blob_digest(movie.video_file.name))
+        session.refresh_from_db()
+        self.assertEqual((session.state, session.movie_id), ("committed", movie.pk))
+
+    def test_commit_rejects_an_unknown_access(self):
+        session = self.create_session()
+        self.send(session, 0, self.content)
+        response = self.client.post(
+            reverse("upload_commit", kwargs={"upload_id": session.pk}),
+            {"title": "Clip", "description": "Uploaded", "access": "everyone"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        session.refresh_from_db()
+        self.assertEqual(session.state, "uploading")
+
+    def test_failed_commit_can_be_retried(self):
+        session = self.create_session()
+        self.send(session, 0, self.content)
+        self.client.post(
+            reverse("upload_commit", kwargs={"upload_id": session.pk}),
+            {"title": "Clip", "description": "Uploaded"},
+        )
+
+        with mock.patch("movies.signals.attach_blob", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                commit_upload(session.pk)
+        self.assertFalse(Movie.objects.exists())
+        session.refresh_from_db()
+        self.assertIsNotNone(blob_digest(session.path))
+
+        movie_id = commit_upload(session.pk)
+        self.assertEqual(Movie.objects.get().pk, movie_id)
+        self.assertEqual(commit_upload(session.pk), movie_id)
+        self.assertEqual(Movie.objects.count(), 1)
+
+    def test_stale_sessions_are_removed_with_their_file(self):
+        session = self.create_session()
+        later = timezone.now() + timedelta(days=2)
+        self.assertEqual(list(stale_upload_sessions(now=timezone.now())), [])
+        self.assertEqual(remove_upload_sessions(stale_upload_sessions(now=later)), 1)
+        self.assertFalse(os.path.exists(self.file_path(session)))
+        self.assertFalse(UploadSession.objects.exists())
+
+
+class ListingCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = CustomUser.objects.create_user(email="owner@test.com", password="pw")
+        (self.movie,) = Movie.objects.bulk_create(
+            [Movie(title="Open", video_file="videos/open.mp4", user=owner, access="public")]
+        )
+        cache.clear()
+
+    def titles(self):
+        response = self.client.get(reverse("video"))
+        return [movie["title"] for movie in response.data["results"]]
+
+    def test_cached_page_is_invalidated_when_a_movie_changes(self):
+        self.assertEqual(self.titles(), ["Open"])
+        movie = Movie.objects.get(pk=self.movie.pk)
+        movie.title = "Renamed"
+        movie.save()
+        self.assertEqual(self.titles(), ["Renamed"])
+
+    def test_cached_page_is_invalidated_when_a_movie_turns_private(self):
+        self.assertEqual(self.titles(), ["Open"])
+        movie = Movie.objects.get(pk=self.movie.pk)
+        movie.access = "private"
+        movie.save()
+        self.assertEqual(self.titles(), [])
+
+
+class ConditionalListingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = CustomUser.objects.create_user(email="owner@test.com", password="pw")
+        (self.movie,) = Movie.objects.bulk_create(
+            [Movie(title="Open", video_file="videos/open.mp4", user=owner, access="public")]
+        )
+        cache.clear()
+
+    def test_matching_if_none_match_returns_304(self):
+        etag = self.client.get(reverse("video"))["ETag"]
+        response = self.client.get(reverse("video"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_changed_listing_returns_200(self):
+        etag = self.client.get(reverse("video"))["ETag"]
+        movie = Movie.objects.get(pk=self.movie.pk)
+        movie.title = "Renamed"
+        movie.save()
+        response = self.client.get(reverse("video"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
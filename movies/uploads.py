@@ -0,0 +1,358 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+import django_rq
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Movie, UploadSession
+from .serializers import MovieSerializer
+from .storage import blob_digest
+
+TUS_VERSION = "1.0.0"
+CHUNK_READ_SIZE = 1024 * 1024
+# Bytes per second `commit_upload` is assumed to hash at, for its job timeout.
+COMMIT_HASH_RATE = 50 * 1024 ** 2
+COMMIT_MIN_TIMEOUT = 360
+
+
+def tus_headers(session):
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(session.offset),
+        "Upload-Length": str(session.size),
+        "Cache-Control": "no-store",
+    }
+
+
+def session_data(session):
+    return {
+        "id": session.id,
+        "offset": session.offset,
+        "size": session.size,
+        "state": session.state,
+        "movie": session.movie_id,
+    }
+
+
+def session_busy_response(session):
+    """
+    Return a 409 response when the session no longer accepts changes.
+    """
+    if session.state in ("committing", "committed"):
+        return Response(
+            {"error": f"Upload is {session.state}."}, status=status.HTTP_409_CONFLICT
+        )
+    return None
+
+
+def commit_upload(session_id):
+    """
+    Hash a completed upload, move it to its content-addressed name and save its `Movie`.
+
+    Runs as an RQ job, as hashing a file of several gigabytes takes too long for a
+    request. The movie fields were validated and stored on the session when the
+    upload was committed. Saving the movie fires `post_save`, which enqueues
+    thumbnail and transcode jobs or reuses the media of an identical earlier upload.
+
+    The job may be retried: the content-addressed name is stored in the session's
+    `path` as soon as the file is moved, and the movie is saved in the same
+    transaction that marks the session committed.
+
+    Args:
+        session_id (UUID): The primary key of the upload session.
+
+    Returns:
+        int: The primary key of the new movie.
+    """
+    session = UploadSession.objects.get(pk=session_id)
+    if session.movie_id is not None:
+        return session.movie_id
+
+    data = {**session.details, "user": session.user_id}
+    access = data.pop("access", "private")
+    movie_serializer = MovieSerializer(data=data)
+    movie_serializer.is_valid(raise_exception=True)
+
+    if blob_digest(session.path) is None:
+        storage = Movie._meta.get_field("video_file").storage
+        session.path = storage.adopt(session.path)
+        UploadSession.objects.filter(pk=session.pk).update(path=session.path)
+
+    with transaction.atomic():
+        movie = movie_serializer.save(video_file=session.path, access=access)
+        UploadSession.objects.filter(pk=session.pk).update(
+            state="committed", movie=movie, updated_at=timezone.now()
+        )
+    return movie.pk
+
+
+def record_commit_failure(job, connection, type, value, traceback):
+    """
+    RQ failure callback marking the upload session of a `commit_upload` job as failed.
+    """
+    UploadSession.objects.filter(pk=job.args[0]).update(
+        state="failed", updated_at=timezone.now()
+    )
+
+
+def stale_upload_sessions(now=None):
+    """
+    Return the upload sessions untouched for `UPLOAD_SESSION_TTL` seconds.
+    """
+    if now is None:
+        now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    return UploadSession.objects.filter(updated_at__lt=cutoff)
+
+
+def remove_upload_sessions(sessions):
+    """
+    Delete upload sessions together with their partially uploaded files.
+
+    Returns:
+        int: The number of sessions deleted.
+    """
+    removed = 0
+    for session in sessions:
+        full_path = os.path.join(settings.MEDIA_ROOT, session.path)
+        # Adopted files are content-addressed and may be shared with other movies;
+        # `sweep_media` removes them once nothing refers to them.
+        if blob_digest(session.path) is None and os.path.isfile(full_path):
+            os.remove(full_path)
+        session.delete()
+        removed += 1
+    return removed
+
+
+class UploadSessions(APIView):
+    """
+    Create resumable upload sessions (tus-style).
+
+    The client announces the file with `filename` and `size` (or an `Upload-Length`
+    header) and then sends the bytes in offset-addressed PATCH requests to the session.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Create an upload session and reserve the file it will be written to.
+
+        Args:
+            request: The HTTP request object with `filename` and `size`.
+
+        Returns:
+            Response: A 201 `Response` with the session id and its `Location`.
+        """
+        filename = get_valid_filename(request.data.get("filename") or "upload.mp4")[-100:]
+        try:
+            size = int(request.data.get("size") or request.headers.get("Upload-Length"))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Upload size is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        max_size = getattr(settings, "UPLOAD_MAX_SIZE", None)
+        if size <= 0 or (max_size and size > max_size):
+            return Response(
+                {"error": "Invalid upload size."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        session = UploadSession(user=request.user, filename=filename, size=size)
+        session.path = os.path.join("videos", f"{session.id.hex}_{filename}")
+        full_path = os.path.join(settings.MEDIA_ROOT, session.path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        open(full_path, "wb").close()
+        session.save()
+
+        response = Response({"id": session.id}, status=status.HTTP_201_CREATED)
+        response["Location"] = request.build_absolute_uri(f"{session.id}/")
+        for header, value in tus_headers(session).items():
+            response[header] = value
+        return response
+
+
+class UploadSessionDetail(APIView):
+    """
+    Report, extend or abort a resumable upload session.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_session(self, request, upload_id):
+        return get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+
+    def head(self, request, *args, **kwargs):
+        """
+        Return the current offset of the session so the client knows where to resume.
+        """
+        session = self.get_session(request, kwargs.get("upload_id"))
+        response = Response(status=status.HTTP_200_OK)
+        for header, value in tus_headers(session).items():
+            response[header] = value
+        return response
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return the offset and state of the session, and the movie once committed.
+        """
+        session = self.get_session(request, kwargs.get("upload_id"))
+        response = Response(session_data(session), status=status.HTTP_200_OK)
+        for header, value in tus_headers(session).items():
+            response[header] = value
+        return response
+
+    def patch(self, request, *args, **kwargs):
+        """
+        Write one chunk of the file at the offset given in the `Upload-Offset` header.
+
+        The body is streamed straight into the reserved file without being buffered or
+        spooled to a temporary file. The offset must match the bytes already received,
+        so a retried chunk never corrupts the file.
+
+        Returns:
+            Response: A 204 `Response` with the new `Upload-Offset`, or 409 on an offset
+            mismatch or once the upload is committed.
+        """
+        session = self.get_session(request, kwargs.get("upload_id"))
+        busy = session_busy_response(session)
+        if busy is not None:
+            return busy
+        try:
+            offset = int(request.headers.get("Upload-Offset"))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Upload-Offset header is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if offset != session.offset:
+            response = Response(
+                {"error": "Upload-Offset does not match the received bytes."},
+                status=status.HTTP_409_CONFLICT,
+            )
+            response["Upload-Offset"] = str(session.offset)
+            return response
+
+        remaining = session.size - offset
+        written = 0
+        with open(os.path.join(settings.MEDIA_ROOT, session.path), "r+b") as target:
+            target.seek(offset)
+            while True:
+                chunk = request.stream.read(CHUNK_READ_SIZE) if request.stream else b""
+                if not chunk:
+                    break
+                if written + len(chunk) > remaining:
+                    return Response(
+                        {"error": "Chunk exceeds the announced upload size."},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    )
+                target.write(chunk)
+                written += len(chunk)
+
+        updated = UploadSession.objects.filter(
+            pk=session.pk, offset=offset, state=session.state
+        ).update(offset=offset + written, updated_at=timezone.now())
+        if not updated:
+            return Response(
+                {"error": "Concurrent upload to the same session."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        session.offset = offset + written
+
+        response = Response(status=status.HTTP_204_NO_CONTENT)
+        for header, value in tus_headers(session).items():
+            response[header] = value
+        return response
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Abort the session and remove the partially uploaded file.
+        """
+        session = self.get_session(request, kwargs.get("upload_id"))
+        if session.state == "committing":
+            return session_busy_response(session)
+        remove_upload_sessions([session])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCommit(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Queue a completed upload to be turned into a `Movie`.
+
+        The movie fields are validated here and stored on the session; the
+        `commit_upload` job hashes the file and saves the movie. Clients poll the
+        session until its `state` is `committed` and read the movie id from it. A
+        failed commit may be retried.
+
+        Args:
+            request: The HTTP request object with `title`, `description`, `genre` and `access`.
+
+        Returns:
+            Response: A 202 `Response` with the session, 409 if bytes are missing or the
+            upload is already committed, or 400 on validation errors.
+        """
+        session = get_object_or_404(
+            UploadSession, pk=kwargs.get("upload_id"), user=request.user
+        )
+        busy = session_busy_response(session)
+        if busy is not None:
+            return busy
+        if session.offset != session.size:
+            response = Response(
+                {"error": "Upload is not complete."}, status=status.HTTP_409_CONFLICT
+            )
+            response["Upload-Offset"] = str(session.offset)
+            return response
+
+        data = {
+            "title": request.data.get("title"),
+            "description": request.data.get("description"),
+            "genre": request.data.get("genre", "Nature"),
+            "user": request.user.pk,
+        }
+        movie_serializer = MovieSerializer(data=data)
+        if not movie_serializer.is_valid():
+            return Response(movie_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        access = request.data.get("access", "private")
+        if access not in dict(Movie.ACCESS_OPTIONS):
+            return Response(
+                {"access": ["Must be one of: public, private."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        details = {key: data[key] for key in ("title", "description", "genre")}
+        details["access"] = access
+        updated = UploadSession.objects.filter(
+            pk=session.pk, state=session.state
+        ).update(state="committing", details=details, updated_at=timezone.now())
+        if not updated:
+            return Response(
+                {"error": "Upload is already being committed."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        session.state = "committing"
+        django_rq.get_queue("default").enqueue(
+            commit_upload,
+            session.pk,
+            job_timeout=max(COMMIT_MIN_TIMEOUT, session.size // COMMIT_HASH_RATE),
+            on_failure=record_commit_failure,
+        )
+
+        response = Response(session_data(session), status=status.HTTP_202_ACCEPTED)
+        response["Location"] = request.build_absolute_uri(
+            reverse("upload_detail", kwargs={"upload_id": session.pk})
+        )
+        return response
@@ -1,53 +1,153 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+import django_rq
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from .cache import get_cached_listing, listing_cache_key, set_cached_listing
 from .models import Movie
+from .pagination import MovieCursorPagination
+from .search import prefix_tsquery, search_movies
 from .serializers import MovieSerializer
+from .signing import url_epoch
+from .tasks import combine_progress
+
+
+def listing_validators(request, user_id, videos):
+    """
+    Compute the ETag and Last-Modified values of a video listing.
+
+    Both come from one aggregate query over the visible movies: any added, edited or
+    deleted movie changes either the latest `updated_at` or the row count. User
+    listings also include the signing period, as their signed URLs change with it.
+
+    Args:
+        request: The HTTP request object; its query string is part of the ETag.
+        user_id: The user whose private movies are included, if any.
+        videos (QuerySet): The movies visible to the request.
+
+    Returns:
+        tuple: The quoted ETag and the last modification as a Unix timestamp (or None).
+    """
+    stats = videos.aggregate(latest=Max("updated_at"), count=Count("id"))
+    latest = stats["latest"]
+    validator = "{}|{}|{}|{}|{}".format(
+        user_id,
+        latest.isoformat() if latest else "",
+        stats["count"],
+        request.META.get("QUERY_STRING", ""),
+        url_epoch() if user_id else "",
+    )
+    etag = '"{}"'.format(hashlib.md5(validator.encode()).hexdigest())
+    last_modified = int(latest.timestamp()) if latest else None
+    return etag, last_modified
+
+
+def listing_owner(request, user_id):
+    """
+    Return `user_id` if the request is authenticated as that user, else None.
+
+    Private movies, and their signed media URLs, are only listed for their owner;
+    anyone else asking for a user's listing gets the public movies.
+    """
+    if user_id and request.user.is_authenticated and request.user.pk == user_id:
+        return user_id
+    return None
+
 
-# from django.core.cache.backends.base import DEFAULT_TIMEOUT
-# from django.views.decorators.cache import cache_page
-# from django.conf import settings
-# from django.utils.decorators import method_decorator
+def visible_movies(request, user_id):
+    """
+    Build the queryset of movies a listing request may see.
 
+    Args:
+        request: The HTTP request object with the optional `genre` and `access` filters.
+        user_id: The user whose private movies are included, if any. Callers pass
+            it through `listing_owner` first.
 
-# CACHE_TTL = getattr(settings, "CACHE_TTL", DEFAULT_TIMEOUT)
+    Returns:
+        QuerySet: The public movies plus the user's private movies, filtered.
+    """
+    visible = Q(access="public")
+    if user_id:
+        visible |= Q(user=user_id, access="private")
+    videos = Movie.objects.filter(visible)
+
+    genre = request.query_params.get("genre")
+    if genre:
+        videos = videos.filter(genre=genre)
+    access = request.query_params.get("access")
+    if access:
+        videos = videos.filter(access=access)
+    return videos
 
 
 class Video(APIView):
-    # @method_decorator(cache_page(CACHE_TTL))
     def get(self, request, *args, **kwargs):
         """
-        Retrieve the list of movies based on their access settings.
+        Retrieve one page of movies based on their access settings.
+
+        Movies are returned newest first and paginated with a cursor; the `next` link of
+        the response points at the following page. The optional `genre` and `access`
+        query parameters narrow down the listing. Pages are cached in Redis until a
+        movie they could contain changes (see `movies.cache`).
+
+        Responses carry an `ETag` and `Last-Modified` derived from the visible movies,
+        so a client polling an unchanged feed gets `304 Not Modified` without the page
+        being serialized.
 
         Args:
             request: The HTTP request object.
             *args: Additional positional arguments.
-            **kwargs: Additional keyword arguments, including `user_id` for private videos.
+            **kwargs: Additional keyword arguments, including `user_id` for private
+                videos, which are only included when the request is made by that user.
 
         Returns:
-            Response: A `Response` object containing the list of movies in JSON format or an error message.
+            Response: A `Response` object containing the page of movies and the `next` link, or an error message.
         """
-        user_id = kwargs.get("user_id")
-        try:
-            public_videos = Movie.objects.filter(access="public")
-            if user_id:
-                private_videos = Movie.objects.filter(user=user_id, access="private")
-            else:
-                private_videos = Movie.objects.none()
-
-            videos = public_videos | private_videos
+        user_id = listing_owner(request, kwargs.get("user_id"))
+        videos = visible_movies(request, user_id)
 
-            if not videos.exists():
-                return Response([], status=status.HTTP_200_OK)
+        etag, last_modified = listing_validators(request, user_id, videos)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
 
-            serializer = MovieSerializer(videos, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = MovieCursorPagination()
+        cache_key = listing_cache_key(request, user_id)
+        data = get_cached_listing(cache_key)
+        try:
+            if data is None:
+                page = paginator.paginate_queryset(
+                    videos.prefetch_related("renditions"), request
+                )
+                serializer = MovieSerializer(page, many=True)
+                data = paginator.get_paginated_response(serializer.data).data
+                set_cached_listing(cache_key, data)
+        except APIException:
+            raise
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        response = Response(data, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
     def post(self, request, *args, **kwargs):
         """
         Create a new movie entry.
@@ -93,3 +193,184 @@ class Video(APIView):
         movie.delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class VideoThumbnail(APIView):
+    def get(self, request, *args, **kwargs):
+        """
+        Report whether a movie's thumbnail has been generated yet.
+
+        Thumbnails are created by a background job after upload, so clients poll this
+        endpoint until `thumbnail_state` is no longer `pending`. The URL is the same
+        one the listings return, signed for private movies.
+
+        Args:
+            request: The HTTP request object.
+            **kwargs: Additional keyword arguments, including `movie_id`.
+
+        Returns:
+            Response: A `Response` object with the thumbnail state and URL, or a `403`
+            for another user's private movie.
+        """
+        movie = get_object_or_404(Movie, pk=kwargs.get("movie_id"))
+        forbidden = private_movie_response(request, movie)
+        if forbidden is not None:
+            return forbidden
+
+        thumbnail_url = None
+        if movie.thumbnail_file:
+            thumbnail_url = MovieSerializer().media_url(movie, movie.thumbnail_file.name)
+
+        return Response(
+            {"thumbnail_state": movie.thumbnail_state, "thumbnail_url": thumbnail_url},
+            status=status.HTTP_200_OK,
+        )
+
+
+class VideoSearch(APIView):
+    def get(self, request, *args, **kwargs):
+        """
+        Search movie titles and descriptions.
+
+        Every word of `q` is matched as a prefix, titles rank above descriptions, and
+        the best `limit` matches are returned. Public movies are searched, plus the
+        requesting user's private movies; `genre` and `access` narrow the search like
+        they narrow the listing.
+
+        Args:
+            request: The HTTP request object with `q` and the optional `limit`,
+                `genre` and `access` query parameters.
+
+        Returns:
+            Response: A `Response` object with the ranked `results`, or an error message.
+        """
+        text = request.query_params.get("q", "")
+        if not prefix_tsquery(text):
+            return Response(
+                {"error": "Provide a search text in the q parameter."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = int(request.query_params.get("limit", settings.VIDEO_PAGE_SIZE))
+        except ValueError:
+            limit = settings.VIDEO_PAGE_SIZE
+        limit = max(1, min(limit, settings.VIDEO_MAX_PAGE_SIZE))
+
+        user_id = request.user.pk if request.user.is_authenticated else None
+        movies = search_movies(visible_movies(request, user_id), text)
+        movies = list(movies.prefetch_related("renditions")[:limit])
+
+        results = MovieSerializer(movies, many=True).data
+        for result, movie in zip(results, movies):
+            result["rank"] = movie.rank
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+def private_movie_response(request, movie):
+    """
+    Return a `403` response when `movie` is private and not the requesting user's.
+
+    Returns:
+        Response: The error response, or None when the user may view the movie.
+    """
+    if movie.access == "private" and movie.user_id != request.user.pk:
+        return Response(
+            {"error": "Not authorized to view this movie."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    return None
+
+
+def job_progress(job_id):
+    """
+    Read the transcode progress stored in the meta of an RQ job.
+
+    For a movie encoded in segments the job is the one that split the source; its
+    progress is combined from the segment jobs listed in its meta.
+
+    Returns:
+        dict: The progress, or None when the job is gone.
+    """
+    connection = django_rq.get_connection()
+    try:
+        job = Job.fetch(job_id, connection=connection)
+    except NoSuchJobError:
+        return None
+    segment_ids = job.meta.get("segment_jobs")
+    if not segment_ids:
+        return job.meta.get("progress")
+    parts = [
+        # Finished segment jobs expire after their result TTL.
+        segment.meta.get("progress") if segment is not None else {"percent": 100.0}
+        for segment in Job.fetch_many(segment_ids, connection=connection)
+    ]
+    return combine_progress(parts)
+
+
+class VideoStatus(APIView):
+    def get(self, request, *args, **kwargs):
+        """
+        Report the processing state of a movie, including live transcode progress.
+
+        Progress (percent, fps, ETA) is read from the meta of the RQ job transcoding the
+        movie, so clients can follow an upload without polling the full listing.
+
+        Args:
+            request: The HTTP request object.
+            **kwargs: Additional keyword arguments, including `movie_id`.
+
+        Returns:
+            Response: A `Response` object with the processing and thumbnail states,
+            the transcode progress and the renditions.
+        """
+        movie = get_object_or_404(
+            Movie.objects.prefetch_related("renditions"), pk=kwargs.get("movie_id")
+        )
+        forbidden = private_movie_response(request, movie)
+        if forbidden is not None:
+            return forbidden
+
+        progress = None
+        if movie.processing_job_id and movie.processing_state == "processing":
+            progress = job_progress(movie.processing_job_id)
+
+        serializer = MovieSerializer(movie)
+        return Response(
+            {
+                "processing_state": movie.processing_state,
+                "thumbnail_state": movie.thumbnail_state,
+                "progress": progress,
+                "stream_manifest_url": serializer.data["stream_manifest_url"],
+                "renditions": [
+                    {
+                        "resolution": rendition.resolution,
+                        "ready": rendition.ready,
+                        "url": serializer.get_video_resolution_url(
+                            movie, rendition.resolution
+                        ),
+                    }
+                    for rendition in movie.renditions.all()
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class OwnVideos(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Retrieve one page of the authenticated user's own movies, public and private.
+
+        Args:
+            request: The HTTP request object with the optional `cursor` and `page_size` parameters.
+
+        Returns:
+            Response: A `Response` object containing the page of movies and the `next` link.
+        """
+        videos = Movie.objects.filter(user=request.user).prefetch_related("renditions")
+        paginator = MovieCursorPagination()
+        page = paginator.paginate_queryset(videos, request)
+        serializer = MovieSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
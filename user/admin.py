@@ -1,16 +1,26 @@
 from import_export import resources
 from django.contrib import admin
 from .forms import UserCreationForm
-from user.models import CustomUser
-from import_export.admin import ImportExportModelAdmin
+from user.models import CustomUser, SelectedMovie
+from movie_town_backend.utils import (
+    EXPORT_FORMATS,
+    BackgroundImportAdmin,
+    background_export_action,
+)
+
+
+class SelectedMovieInline(admin.TabularInline):
+    model = SelectedMovie
+    extra = 0
+    raw_id_fields = ("movie",)
 
 
 # Register your models here.
 @admin.register(CustomUser)
-class CustomUserAdmin(ImportExportModelAdmin):
+class CustomUserAdmin(BackgroundImportAdmin):
     """Admin interface for the CustomUser model with import/export capabilities.
     This class customizes the Django admin interface for managing `CustomUser` instances.
-    It also integrates with `django-import-export` to provide data import and export functionality.
+    Imports and exports run in RQ jobs, see `movie_town_backend.utils`.
     """
 
     add_form = UserCreationForm
@@ -29,8 +39,11 @@ class CustomUserAdmin(ImportExportModelAdmin):
             },
         ),
         ("Address", {"fields": ("address",)}),
-        ("Selected Movies", {"fields": ("selected_movies",)}),
     )
+    inlines = [SelectedMovieInline]
+    import_name = "users"
+    # Exports and imports are streamed by an RQ worker.
+    actions = [background_export_action("users", format) for format in EXPORT_FORMATS]
     list_display = ("email", "first_name", "last_name", "is_staff")
 
 
@@ -1,6 +1,74 @@
-from rest_framework.authentication import SessionAuthentication, BasicAuthentication 
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authentication import (
+    BasicAuthentication,
+    SessionAuthentication,
+    TokenAuthentication,
+)
+from rest_framework.authtoken.models import Token
+
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
 
     def enforce_csrf(self, request):
         return  # To not perform the csrf check previously happening
+
+
+def token_cache_key(key):
+    """
+    Return the cache key of a token's user; the token itself is never stored in keys.
+    """
+    return "auth_token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def cached_user_fields(user):
+    """
+    Return the field values of a user that may be cached; the password hash is left out.
+    """
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname != "password"
+    }
+
+
+def user_from_cache(fields):
+    """
+    Rebuild a user from `cached_user_fields`.
+
+    The password is a deferred field: it is loaded from the database only if read,
+    and `save()` leaves it untouched.
+    """
+    return get_user_model().from_db("default", list(fields), list(fields.values()))
+
+
+def forget_tokens(*keys):
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+def forget_user_tokens(user_id):
+    forget_tokens(*Token.objects.filter(user_id=user_id).values_list("key", flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that keeps token → user lookups in the cache.
+
+    A cache hit authenticates the request without the `Token` + user query. Only the
+    user's field values are cached, never the password hash. Entries live for `AUTH_TOKEN_CACHE_TTL` seconds and are dropped by `user.signals` when the
+    token is deleted or its user is saved (deactivated, password changed, ...).
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        fields = cache.get(cache_key)
+        if fields is not None:
+            user = user_from_cache(fields)
+            return user, Token(key=key, user=user)
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, cached_user_fields(user), settings.AUTH_TOKEN_CACHE_TTL)
+        return user, token
@@ -0,0 +1,144 @@
+import logging
+import pickle
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+import django_rq
+
+OUTBOX_KEY = "mail:outbox"
+DEAD_LETTER_KEY = "mail:outbox:dead"
+FLUSH_SCHEDULED_KEY = "mail:outbox:flush_scheduled"
+# Seconds before the next flush after a message failed its n-th attempt; the last
+# delay repeats until the message is dead-lettered.
+RETRY_DELAYS = [10, 30, 120, 600, 1800]
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_connection():
+    return django_rq.get_connection("mail")
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Email backend that queues messages in Redis instead of sending them.
+
+    Requests only pay for an `RPUSH`; the `flush_outbox` job on the `mail` queue
+    delivers everything queued so far over one connection of `MAIL_OUTBOX_BACKEND`.
+    """
+
+    def send_messages(self, email_messages):
+        """
+        Queue messages for delivery and make sure a flush job is scheduled.
+
+        Args:
+            email_messages (list): The `EmailMessage` objects to send.
+
+        Returns:
+            int: The number of messages queued.
+        """
+        if not email_messages:
+            return 0
+
+        payloads = []
+        for message in email_messages:
+            # The connection of the sending backend cannot be pickled.
+            message.connection = None
+            payloads.append(pickle.dumps({"message": message, "attempts": 0}))
+
+        redis = outbox_connection()
+        redis.rpush(OUTBOX_KEY, *payloads)
+        schedule_flush(redis)
+        return len(email_messages)
+
+
+def schedule_flush(redis, delay=0):
+    """
+    Enqueue a `flush_outbox` job, after `delay` seconds, unless one is already waiting.
+    """
+    timeout = settings.MAIL_FLUSH_TIMEOUT
+    if not redis.set(FLUSH_SCHEDULED_KEY, 1, nx=True, ex=delay + timeout):
+        return
+    queue = django_rq.get_queue("mail")
+    if delay:
+        queue.enqueue_in(timedelta(seconds=delay), flush_outbox, job_timeout=timeout)
+    else:
+        queue.enqueue(flush_outbox, job_timeout=timeout)
+
+
+def retry_delay(attempts):
+    return RETRY_DELAYS[min(attempts, len(RETRY_DELAYS)) - 1]
+
+
+def flush_outbox():
+    """
+    Deliver every queued message over a single connection.
+
+    At most `MAIL_BATCH_SIZE` messages are sent per job. A message that cannot be
+    delivered is put back at the end of the outbox, so it cannot hold up the others,
+    and the next flush is scheduled with a backoff that grows with the message's
+    failed attempts. After `MAIL_MAX_ATTEMPTS` failed attempts the message is moved
+    to the `mail:outbox:dead` list instead. The job itself still fails, so the error
+    shows up in the RQ dashboard.
+
+    Returns:
+        int: The number of messages delivered.
+    """
+    redis = outbox_connection()
+    # Messages queued from now on schedule a new flush.
+    redis.delete(FLUSH_SCHEDULED_KEY)
+
+    payload = redis.lpop(OUTBOX_KEY)
+    if payload is None:
+        return 0
+
+    sent = 0
+    connection = get_connection(settings.MAIL_OUTBOX_BACKEND, fail_silently=False)
+    try:
+        connection.open()
+        while payload is not None:
+            entry = pickle.loads(payload)
+            connection.send_messages([entry["message"]])
+            payload = None
+            sent += 1
+            if sent >= settings.MAIL_BATCH_SIZE:
+                break
+            payload = redis.lpop(OUTBOX_KEY)
+    except Exception:
+        delay = RETRY_DELAYS[0]
+        if payload is not None:
+            delay = retry_delay(requeue_failed(redis, payload))
+        if redis.llen(OUTBOX_KEY):
+            schedule_flush(redis, delay)
+        raise
+    finally:
+        connection.close()
+
+    if redis.llen(OUTBOX_KEY):
+        # More than one batch was queued; hand the rest to a fresh job.
+        schedule_flush(redis)
+    return sent
+
+
+def requeue_failed(redis, payload):
+    """
+    Count a failed delivery attempt and put the message back, or dead-letter it.
+
+    Returns:
+        int: The number of failed attempts of the message.
+    """
+    entry = pickle.loads(payload)
+    entry["attempts"] += 1
+    if entry["attempts"] >= settings.MAIL_MAX_ATTEMPTS:
+        logger.error(
+            "Giving up on mail %r to %s after %d attempts.",
+            entry["message"].subject,
+            entry["message"].to,
+            entry["attempts"],
+        )
+        redis.rpush(DEAD_LETTER_KEY, pickle.dumps(entry))
+    else:
+        redis.rpush(OUTBOX_KEY, pickle.dumps(entry))
+    return entry["attempts"]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def selected_movies_to_rows(apps, schema_editor):
+    CustomUser = apps.get_model("user", "CustomUser")
+    Movie = apps.get_model("movies", "Movie")
+    SelectedMovie = apps.get_model("user", "SelectedMovie")
+
+    existing_ids = set(Movie.objects.values_list("id", flat=True))
+    rows = []
+    for user in CustomUser.objects.exclude(selected_movies=[]).iterator():
+        movie_ids = set()
+        for entry in user.selected_movies or []:
+            movie_id = entry.get("id") if isinstance(entry, dict) else entry
+            try:
+                movie_id = int(movie_id)
+            except (TypeError, ValueError):
+                continue
+            if movie_id in existing_ids:
+                movie_ids.add(movie_id)
+        rows.extend(
+            SelectedMovie(user_id=user.pk, movie_id=movie_id) for movie_id in movie_ids
+        )
+    SelectedMovie.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def rows_to_selected_movies(apps, schema_editor):
+    CustomUser = apps.get_model("user", "CustomUser")
+    SelectedMovie = apps.get_model("user", "SelectedMovie")
+
+    selections = {}
+    for user_id, movie_id in SelectedMovie.objects.values_list("user_id", "movie_id"):
+        selections.setdefault(user_id, []).append({"id": movie_id})
+    for user_id, movies in selections.items():
+        CustomUser.objects.filter(pk=user_id).update(selected_movies=movies)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_movie_updated_at'),
+        ('user', '0008_alter_customuser_selected_movies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SelectedMovie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='selections', to='movies.movie')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='selections', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='selectedmovie',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='unique_user_selected_movie'),
+        ),
+        migrations.RunPython(selected_movies_to_rows, rows_to_selected_movies),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='selected_movies',
+        ),
+    ]
@@ -66,7 +66,6 @@ class CustomUser(AbstractUser):
     address = models.CharField(max_length=200, blank=True)
     birth_date = models.DateField(null=True, blank=True)
     email_is_verified = models.BooleanField(default=False)
-    selected_movies = models.JSONField(default=list, blank=True)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -81,3 +80,27 @@ class CustomUser(AbstractUser):
             str: The email of the user.
         """
         return self.email
+
+
+class SelectedMovie(models.Model):
+    """
+    A movie a user has added to their selection. One row per (user, movie) pair.
+    """
+
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="selections"
+    )
+    movie = models.ForeignKey(
+        "movies.Movie", on_delete=models.CASCADE, related_name="selections"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "movie"], name="unique_user_selected_movie"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.movie}"
@@ -0,0 +1,96 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+
+def hit(key, limit, window):
+    """
+    Record an attempt in a sliding window and check it against the limit.
+
+    Attempts are kept in a Redis sorted set scored by time; entries older than the
+    window are trimmed on every hit, so the count covers exactly the last `window`
+    seconds. Rejected attempts count too, so a client that keeps retrying stays
+    blocked.
+
+    Args:
+        key (str): The identity being limited, e.g. `login:ip:10.0.0.1`.
+        limit (int): The number of attempts allowed per window.
+        window (int): The window length in seconds.
+
+    Returns:
+        int: 0 if the attempt is allowed, otherwise the seconds until it would be.
+    """
+    redis = get_redis_connection("default")
+    redis_key = f"ratelimit:{key}"
+    now = time.time()
+
+    pipe = redis.pipeline()
+    pipe.zremrangebyscore(redis_key, 0, now - window)
+    pipe.zadd(redis_key, {f"{now}:{uuid.uuid4().hex[:8]}": now})
+    pipe.zcard(redis_key)
+    pipe.expire(redis_key, window)
+    pipe.zrange(redis_key, 0, 0, withscores=True)
+    _, _, count, _, oldest = pipe.execute()
+
+    if count <= limit:
+        return 0
+    return max(1, int(oldest[0][1] + window - now) + 1)
+
+
+def client_ip(request):
+    """
+    Return the address of the client behind `RATE_LIMIT_TRUSTED_PROXIES` proxies.
+
+    Every proxy appends the address it received the request from to
+    `X-Forwarded-For`, so with N trusted proxies the Nth entry from the right is the
+    client. Entries further left are whatever the client sent and are ignored.
+
+    Args:
+        request: The HTTP request.
+
+    Returns:
+        str: The client address; `REMOTE_ADDR` when no proxy is trusted or the
+        header is shorter than expected.
+    """
+    remote_addr = request.META.get("REMOTE_ADDR", "")
+    proxies = getattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 0)
+    if not proxies:
+        return remote_addr
+    forwarded = [
+        address.strip()
+        for address in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+        if address.strip()
+    ]
+    if len(forwarded) < proxies:
+        return remote_addr
+    return forwarded[-proxies]
+
+
+def check_rate_limit(scope, request, email=None):
+    """
+    Apply the `RATE_LIMITS` of a scope to the client address and, if given, the email.
+
+    Args:
+        scope (str): The entry of `RATE_LIMITS` to apply, e.g. `login`.
+        request: The HTTP request; `client_ip` identifies the client.
+        email (str, optional): The account the request targets; anything but a
+            string, e.g. a list from a JSON body, is ignored.
+
+    Returns:
+        int: 0 if the request may proceed, otherwise the seconds to wait.
+    """
+    limits = settings.RATE_LIMITS[scope]
+    identities = [("ip", client_ip(request))]
+    if isinstance(email, str) and email.strip():
+        # Emails are hashed so addresses never appear in Redis keys.
+        digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        identities.append(("email", digest))
+
+    retry_after = 0
+    for kind, identity in identities:
+        limit, window = limits[kind]
+        retry_after = max(retry_after, hit(f"{scope}:{kind}:{identity}", limit, window))
+    return retry_after
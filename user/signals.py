@@ -1,9 +1,19 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_tokens, forget_user_tokens
 from .models import CustomUser
 
 
-@receiver(pre_save, sender=CustomUser)
-def verification_pre_save(sender, instance, created, **kwargs):
-    if created:
-        print("user created")
+@receiver(post_save, sender=CustomUser)
+def user_post_save(sender, instance, created, **kwargs):
+    # Cached authentications carry a copy of the user, including is_active and the
+    # password hash, so every change has to reach them.
+    if not created:
+        forget_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def token_post_delete(sender, instance, **kwargs):
+    forget_tokens(instance.key)
@@ -1,10 +1,34 @@
 import json
-from django.test import TestCase
+import os
+import pickle
+import tempfile
+from unittest import mock
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from datetime import datetime
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from user.authentication import CachedTokenAuthentication, token_cache_key
+from movie_town_backend.utils import export_queryset, import_file
+from user.ratelimit import check_rate_limit, client_ip, hit
+from user.mail import (
+    DEAD_LETTER_KEY,
+    FLUSH_SCHEDULED_KEY,
+    OUTBOX_KEY,
+    flush_outbox,
+    outbox_connection,
+)
+from user.models import SelectedMovie
+from user.views import handle_login
+from movies.models import Movie
 
 User = get_user_model()
 
@@ -96,3 +120,239 @@ class UserManagerTests(TestCase):
             email=self.email, password=self.password
         )
         self.assertTrue(superuser.is_superuser)
+
+
+@override_settings(
+    EMAIL_BACKEND="user.mail.QueuedEmailBackend",
+    MAIL_OUTBOX_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class QueuedEmailTests(TestCase):
+    def setUp(self):
+        outbox_connection().delete(OUTBOX_KEY)
+
+    def test_messages_are_delivered_by_the_flush_job(self):
+        mail.send_mail("Hello", "Body", "noreply@example.com", ["a@example.com"])
+        mail.send_mail("Again", "Body", "noreply@example.com", ["b@example.com"])
+        flush_outbox()
+        self.assertEqual([message.subject for message in mail.outbox], ["Hello", "Again"])
+        self.assertEqual(outbox_connection().llen(OUTBOX_KEY), 0)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise OSError("Connection refused")
+
+
+class UndeliverableEmailTests(TestCase):
+    def setUp(self):
+        outbox_connection().delete(OUTBOX_KEY, DEAD_LETTER_KEY, FLUSH_SCHEDULED_KEY)
+
+    @override_settings(
+        MAIL_OUTBOX_BACKEND="user.tests.FailingEmailBackend", MAIL_MAX_ATTEMPTS=2
+    )
+    def test_message_is_dead_lettered_after_max_attempts(self):
+        redis = outbox_connection()
+        message = EmailMessage("Hello", "Body", to=["a@example.com"])
+        redis.rpush(OUTBOX_KEY, pickle.dumps({"message": message, "attempts": 0}))
+
+        with self.assertRaises(OSError):
+            flush_outbox()
+        self.assertEqual(redis.llen(OUTBOX_KEY), 1)
+        # The flush job schedules its own delayed retry.
+        self.assertTrue(redis.exists(FLUSH_SCHEDULED_KEY))
+        with self.assertRaises(OSError):
+            flush_outbox()
+        self.assertEqual(redis.llen(OUTBOX_KEY), 0)
+        self.assertFalse(redis.exists(FLUSH_SCHEDULED_KEY))
+        self.assertEqual(pickle.loads(redis.lindex(DEAD_LETTER_KEY, 0))["attempts"], 2)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="cached@example.com", password="securepassword"
+        )
+        self.token = Token.objects.create(user=self.user)
+        cache.delete(token_cache_key(self.token.key))
+
+    def test_second_lookup_is_served_from_cache(self):
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, _ = authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_password_hash_is_not_cached(self):
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertNotIn("password", cache.get(token_cache_key(self.token.key)))
+
+        user, _ = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertTrue(user.check_password("securepassword"))
+
+    def test_password_change_drops_cached_user(self):
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.user.set_password("newsecurepassword")
+        self.user.save()
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+
+
+class RateLimitTests(TestCase):
+    def test_attempts_over_the_limit_are_rejected(self):
+        key = f"test:{datetime.now().timestamp()}"
+        self.assertEqual([hit(key, 2, 60) for _ in range(2)], [0, 0])
+        self.assertGreater(hit(key, 2, 60), 0)
+
+    def test_forwarded_address_is_ignored_without_trusted_proxies(self):
+        request = RequestFactory().get(
+            "/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="1.2.3.4"
+        )
+        self.assertEqual(client_ip(request), "10.0.0.1")
+
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_client_address_is_taken_from_the_trusted_proxy(self):
+        request = RequestFactory().get(
+            "/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="6.6.6.6, 1.2.3.4"
+        )
+        self.assertEqual(client_ip(request), "1.2.3.4")
+
+    def test_non_string_email_is_limited_by_address_only(self):
+        request = RequestFactory().post("/", REMOTE_ADDR="10.0.0.1")
+        with mock.patch("user.ratelimit.hit", return_value=0) as hit_mock:
+            self.assertEqual(check_rate_limit("login", request, ["a@example.com"]), 0)
+        hit_mock.assert_called_once()
+        self.assertEqual(hit_mock.call_args.args[0], "login:ip:10.0.0.1")
+
+
+class ImportExportTests(TestCase):
+    def test_users_survive_an_export_import_round_trip(self):
+        user = User.objects.create_user(email="export@example.com", password="pw")
+        for format in ("csv", "jsonl"):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, f"users.{format}")
+                self.assertEqual(export_queryset(User.objects.all(), path, format), 1)
+                User.objects.all().delete()
+                self.assertEqual(import_file(User, path), (1, 0))
+                self.assertEqual(import_file(User, path), (0, 1))
+            restored = User.objects.get(pk=user.pk)
+            self.assertEqual(restored.email, "export@example.com")
+            self.assertTrue(restored.check_password("pw"))
+
+
+class MovieSelectTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="picker@example.com", password="pw")
+        self.other = User.objects.create_user(email="other@example.com", password="pw")
+        # bulk_create skips post_save, so no media processing is queued.
+        self.public, self.private = Movie.objects.bulk_create(
+            [
+                Movie(
+                    title="Public",
+                    video_file="videos/public.mp4",
+                    user=self.other,
+                    access="public",
+                ),
+                Movie(
+                    title="Private",
+                    video_file="videos/private.mp4",
+                    user=self.other,
+                    access="private",
+                ),
+            ]
+        )
+        self.url = "/movie_select/"
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_select_list_and_unselect(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {"movie_id": self.public.pk}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(
+            self.url, {"movie": {"id": self.public.pk}}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [movie["id"] for movie in response.data["results"]], [self.public.pk]
+        )
+
+        response = self.client.delete(f"{self.url}?movie_id={self.public.pk}")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(SelectedMovie.objects.filter(user=self.user).exists())
+
+    def test_other_users_private_movies_cannot_be_selected_or_listed(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {"movie_id": self.private.pk}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        SelectedMovie.objects.create(user=self.user, movie=self.private)
+        self.assertEqual(self.client.get(self.url).data["results"], [])
+
+    def test_invalid_input_is_rejected(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {"movie": "abc"}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {"movie_id": "x"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"user_id": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"user_id": self.other.pk})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LoginPayloadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="login@example.com", password="pw")
+        # bulk_create skips post_save, so no media processing is queued.
+        Movie.objects.bulk_create(
+            [
+                Movie(title=f"Movie {i}", video_file=f"videos/{i}.mp4", user=self.user)
+                for i in range(3)
+            ]
+        )
+
+    def test_payload_holds_only_the_token_and_profile(self):
+        result, status_code = handle_login("login@example.com", "pw")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(set(result), {"token", "user", "email"})
+        self.assertEqual(result["token"], Token.objects.get(user=self.user).key)
+        self.assertEqual(result["email"], "login@example.com")
+
+    def test_wrong_password_is_rejected(self):
+        result, status_code = handle_login("login@example.com", "wrong")
+        self.assertEqual(status_code, 400)
+        self.assertNotIn("token", result)
+
+
+class SelectedMovieMigrationTests(TransactionTestCase):
+    migrate_from = ("user", "0008_alter_customuser_selected_movies")
+    migrate_to = ("user", "0009_selectedmovie")
+
+    def test_json_selections_become_rows(self):
+        executor = MigrationExecutor(connection)
+        movies_leaf = executor.loader.graph.leaf_nodes("movies")[0]
+        executor.migrate([self.migrate_from])
+        old_apps = executor.loader.project_state([self.migrate_from, movies_leaf]).apps
+
+        OldUser = old_apps.get_model("user", "CustomUser")
+        OldMovie = old_apps.get_model("movies", "Movie")
+        owner = OldUser.objects.create(email="legacy@example.com")
+        movie = OldMovie.objects.create(
+            title="Legacy", video_file="videos/legacy.mp4", user_id=owner.pk
+        )
+        OldUser.objects.filter(pk=owner.pk).update(
+            # Old clients stored whole movie objects, plain ids and dangling ids.
+            selected_movies=[{"id": movie.pk}, movie.pk, {"id": 999999}, "junk"]
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_to])
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+        self.assertEqual(
+            list(SelectedMovie.objects.values_list("user_id", "movie_id")),
+            [(owner.pk, movie.pk)],
+        )
@@ -1,12 +1,16 @@
 from django.shortcuts import render
 from django.views import View
+from django.db.models import Q
 from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from movies.models import Movie
+from movies.pagination import MovieCursorPagination
 from movies.serializers import MovieSerializer
-from user.models import CustomUser
+from user.models import CustomUser, SelectedMovie
+from .ratelimit import check_rate_limit
 from .serializers import UserSerializer
 from user.forms import User, UserCreationForm
 from rest_framework import status
@@ -26,6 +30,9 @@ def authenticate_user(email, password):
     """
     Authenticate a user based on their email and password.
 
+    Unknown emails still hash the password once, so a failed login costs the same
+    whether or not the account exists and response times reveal nothing.
+
     Args:
         email (str): The email address of the user.
         password (str): The password of the user.
@@ -35,22 +42,28 @@ def authenticate_user(email, password):
     """
     try:
         user = User.objects.get(email=email)
-        if user.check_password(password):
-            return user
     except User.DoesNotExist:
+        User().set_password(password)
         return None
+    if user.check_password(password):
+        return user
+    return None
 
 
 def handle_login(email, password):
     """
     Handle user login, authenticate user, and return necessary details.
 
+    The response only holds the token and the user's profile, so its cost does not
+    depend on how many movies the user owns; clients fetch their movies from
+    `/me/videos/`.
+
     Args:
         email (str): The email address of the user.
         password (str): The password of the user.
 
     Returns:
-        tuple: A dictionary containing the token, user data, email, and user’s movies, and a status code.
+        tuple: A dictionary containing the token, user data and email, and a status code.
     """
     user = authenticate_user(email, password)
     if not user:
@@ -60,21 +73,28 @@ def handle_login(email, password):
 
     token, created = Token.objects.get_or_create(user=user)
 
-    users_videos = Movie.objects.filter(user=user)
-    users_videos = MovieSerializer(users_videos, many=True).data
-
     return {
         "token": token.key,
         "user": UserSerializer(user).data,
         "email": user.email,
-        "users_videos": users_videos,
     }, 200
 
 
+def too_many_requests(retry_after):
+    return Response(
+        {"error": "Too many attempts. Try again later."},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
 class CustomLoginView(APIView):
     """
     Handle POST requests for user login.
 
+    Attempts are rate limited per client address and per email (`RATE_LIMITS`)
+    before the password is hashed.
+
     Args:
         request (Request): The HTTP request object.
 
@@ -92,6 +112,10 @@ class CustomLoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        retry_after = check_rate_limit("login", request, email)
+        if retry_after:
+            return too_many_requests(retry_after)
+
         result, status_code = handle_login(email, password)
         return Response(result, status=status_code)
 
@@ -182,6 +206,9 @@ class FrontendLoginRedirectMiddleware:
 class ResetPasswordView(APIView):
     def post(self, request, *args, **kwargs):
         email = request.data.get("email")
+        retry_after = check_rate_limit("password_reset", request, email)
+        if retry_after:
+            return too_many_requests(retry_after)
         try:
             user = CustomUser.objects.get(email=email)
             uid = urlsafe_base64_encode(force_bytes(user.pk))
@@ -189,6 +216,7 @@ class ResetPasswordView(APIView):
             reset_url = (
                 f"{request.scheme}://localhost:4200/reset-password/{uid}/{token}/"
             )
+            # Queued by the email backend; delivered by the "mail" RQ worker.
             send_mail(
                 subject="Password Reset Requested",
                 message=f"Click the link to reset your password: {reset_url}",
@@ -224,28 +252,140 @@ class PasswordResetConfirmView(APIView):
             return Response({"error": "Invalid token or user ID."}, status=400)
 
 
+def parse_id(value):
+    """
+    Convert a primary key sent by a client to an int.
+
+    Returns:
+        int: The id, or None if the value is missing or not a positive integer.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
 class Movie_Select(APIView):
+    """
+    The selected movies of the authenticated user.
+
+    Older clients also send a `user_id`; it is accepted when it is the authenticated
+    user's own id.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def selection_owner(self, request):
+        """
+        Check the optional `user_id` of a request against the authenticated user.
+
+        Returns:
+            Response: An error response, or None if the request may proceed.
+        """
+        user_id = request.data.get("user_id") or request.query_params.get("user_id")
+        if user_id in (None, ""):
+            return None
+        user_id = parse_id(user_id)
+        if user_id is None:
+            return Response(
+                {"error": "user_id must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if user_id != request.user.pk:
+            return Response(
+                {"error": "Not authorized to access this selection."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return None
+
+    def get(self, request):
+        """
+        Handle GET requests to list the movies the user has selected.
+
+        Movies that became private since they were selected are left out unless the
+        user owns them.
+
+        Args:
+            request (Request): The HTTP request object.
+
+        Returns:
+            Response: One cursor-paginated page of the selected movies.
+        """
+        error = self.selection_owner(request)
+        if error is not None:
+            return error
+        movies = (
+            Movie.objects.filter(selections__user=request.user)
+            .filter(Q(access="public") | Q(user=request.user))
+            .prefetch_related("renditions")
+        )
+        paginator = MovieCursorPagination()
+        page = paginator.paginate_queryset(movies, request)
+        return paginator.get_paginated_response(MovieSerializer(page, many=True).data)
+
     def post(self, request):
         """
         Handle POST requests to add a movie to the user's selected movies.
 
+        The movie is identified by `movie_id`, or by the `id` of a `movie` object for
+        older clients. Selecting a movie twice is a no-op.
+
         Args:
-            request (Request): The HTTP request object containing movie and user data.
+            request (Request): The HTTP request object containing the movie.
 
         Returns:
             Response: The response object indicating the result of the movie selection.
         """
-        movie_data = request.data.get("movie")  # Access movie data from the request
-        user_id = request.data.get("user_id")
-        try:
-            user = User.objects.get(pk=user_id)
-        except User.DoesNotExist:
+        error = self.selection_owner(request)
+        if error is not None:
+            return error
+        movie_id = request.data.get("movie_id")
+        if movie_id is None:
+            movie = request.data.get("movie")
+            movie_id = movie.get("id") if isinstance(movie, dict) else movie
+        movie_id = parse_id(movie_id)
+        if movie_id is None:
+            return Response(
+                {"error": "movie_id must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        visible = Q(access="public") | Q(user=request.user)
+        if not Movie.objects.filter(visible, pk=movie_id).exists():
             return Response(
-                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+                {"error": "Movie not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        user.selected_movies.append(movie_data)
-        user.save()
+
+        _, created = SelectedMovie.objects.get_or_create(
+            user=request.user, movie_id=movie_id
+        )
         return Response(
             {"message": "Movie added to selected movies"},
-            status=status.HTTP_201_CREATED,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
         )
+
+    def delete(self, request):
+        """
+        Handle DELETE requests to remove a movie from the user's selected movies.
+
+        Args:
+            request (Request): The HTTP request object with `movie_id`.
+
+        Returns:
+            Response: An empty response with a 204 status code.
+        """
+        error = self.selection_owner(request)
+        if error is not None:
+            return error
+        movie_id = parse_id(
+            request.data.get("movie_id") or request.query_params.get("movie_id")
+        )
+        if movie_id is None:
+            return Response(
+                {"error": "movie_id must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        SelectedMovie.objects.filter(user=request.user, movie_id=movie_id).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)